@@ -0,0 +1,51 @@
+"""
+Measure ASR throughput: audio seconds processed per wall second.
+
+    python benchmarks/bench_asr.py meeting.wav --modes sequential batched --batch-size 8 --beam-size 5
+
+The model is loaded (and warmed up) before timing, so load time is excluded.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.asr import get_whisper_model, transcribe_audio  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("audio")
+    parser.add_argument("--modes", nargs="+", default=["sequential", "batched"])
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--language", default=None)
+    args = parser.parse_args()
+
+    get_whisper_model(args.compute_type)
+    for mode in args.modes:
+        options = {
+            "mode": mode,
+            "beam_size": args.beam_size,
+            "batch_size": args.batch_size,
+            "compute_type": args.compute_type,
+        }
+        start = time.perf_counter()
+        result = transcribe_audio(args.audio, args.language, options)
+        elapsed = time.perf_counter() - start
+        print(json.dumps({
+            "mode": mode,
+            "audioSeconds": round(result["duration"], 1),
+            "wallSeconds": round(elapsed, 1),
+            "realtimeFactor": round(result["duration"] / elapsed, 2),
+            "segments": len(result["segments"]),
+            "chars": len(result["text"]),
+        }))
+
+
+if __name__ == "__main__":
+    main()
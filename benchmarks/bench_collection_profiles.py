@@ -0,0 +1,141 @@
+"""
+Recall@k and memory per collection profile (utils.collection_profiles) against a running Qdrant:
+
+    python benchmarks/bench_collection_profiles.py --url http://localhost:6333 --points 100000 --dim 1024 --k 10
+
+Every profile gets its own collection filled with the same synthetic clustered, normalized vectors.
+Ground truth is an exact (brute-force) search on the "default" collection.
+Memory is the estimated resident size of vectors plus the HNSW graph, as Qdrant lays them out:
+float32 originals unless on disk, 1 byte (scalar) or 1 bit (binary) per dimension for the quantized copy,
+and about 2 * m links of 4 bytes per point for the bottom graph layer. Payload is not counted.
+Collections are dropped afterwards unless --keep is passed.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct, SearchParams
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.collection_profiles import COLLECTION_PROFILES, collection_config, resolve_profile, search_params  # noqa: E402
+
+
+def make_data(points: int, queries: int, dim: int, clusters: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=points)
+    data = centers[labels] + 0.6 * rng.normal(size=(points, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    picks = rng.integers(0, points, size=queries)
+    query = data[picks] + 0.2 * rng.normal(size=(queries, dim)).astype(np.float32)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    return data, query
+
+
+def estimate_memory(points: int, dim: int, profile: dict) -> int:
+    m = profile["hnsw_m"] or 16
+    total = points * 2 * m * 4
+    if not profile["on_disk"]:
+        total += points * dim * 4
+    if profile["quantization"] == "scalar":
+        total += points * dim
+    elif profile["quantization"] == "binary":
+        total += points * math.ceil(dim / 8)
+    return total
+
+
+def load(client: QdrantClient, name: str, data: np.ndarray, profile: dict, batch: int) -> float:
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(collection_name=name, **collection_config(data.shape[1], profile))
+    start = time.perf_counter()
+    for offset in range(0, len(data), batch):
+        chunk = data[offset:offset + batch]
+        client.upsert(
+            collection_name=name,
+            points=[PointStruct(id=offset + i, vector=v.tolist()) for i, v in enumerate(chunk)],
+            wait=False,
+        )
+    # Wait until the optimizer has built the index, otherwise searches are brute force
+    while True:
+        info = client.get_collection(name)
+        if info.status == "green" and (info.points_count or 0) >= len(data):
+            break
+        time.sleep(1)
+    return time.perf_counter() - start
+
+
+def search(client: QdrantClient, name: str, query: np.ndarray, k: int, params) -> tuple:
+    results, latencies = [], []
+    for q in query:
+        start = time.perf_counter()
+        res = client.query_points(collection_name=name, query=q.tolist(), limit=k, search_params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([p.id for p in res.points])
+    return results, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=os.getenv("QDRANT_HOST", "http://localhost:6333"))
+    parser.add_argument("--api-key", default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--profiles", default=",".join(COLLECTION_PROFILES))
+    parser.add_argument("--hnsw-ef", type=int, nargs="*", default=[None, 128])
+    parser.add_argument("--oversampling", type=float, nargs="*", default=[None])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url, api_key=args.api_key, timeout=300)
+    data, query = make_data(args.points, args.queries, args.dim, args.clusters, args.seed)
+    names = [p for p in args.profiles.split(",") if p]
+    if "default" not in names:
+        names.insert(0, "default")
+
+    collections = {}
+    for name in names:
+        collection = f"bench_profile_{name}"
+        elapsed = load(client, collection, data, resolve_profile(name), args.batch)
+        collections[name] = collection
+        print(json.dumps({"profile": name, "loadSeconds": round(elapsed, 1)}))
+
+    truth, _ = search(client, collections["default"], query, args.k, SearchParams(exact=True))
+    truth = [set(ids) for ids in truth]
+
+    for name in names:
+        profile = resolve_profile(name)
+        for hnsw_ef in args.hnsw_ef:
+            for oversampling in args.oversampling:
+                params = search_params(hnsw_ef, oversampling, None, profile)
+                found, latencies = search(client, collections[name], query, args.k, params)
+                recall = sum(len(t & set(f)) for t, f in zip(truth, found)) / (args.k * len(truth))
+                latencies.sort()
+                print(json.dumps({
+                    "profile": name,
+                    "hnswEf": hnsw_ef,
+                    "oversampling": oversampling if oversampling is not None else profile["oversampling"],
+                    f"recall@{args.k}": round(recall, 4),
+                    "estMemoryMB": round(estimate_memory(args.points, args.dim, profile) / 2 ** 20, 1),
+                    "p50ms": round(latencies[len(latencies) // 2], 2),
+                    "p99ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+                }))
+
+    if not args.keep:
+        for collection in collections.values():
+            client.delete_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
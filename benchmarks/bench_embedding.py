@@ -0,0 +1,124 @@
+"""
+Compare embedding call latency (p50/p99) against a local fake Ark server:
+
+legacy: a new httpx.AsyncClient per call, no retries (as VectorEngine did before)
+pooled: utils.ark_client.ArkClient (keep-alive pool, retries with backoff, adaptive concurrency)
+
+    python benchmarks/bench_embedding.py --requests 500 --concurrency 32 --error-rate 0.05
+
+The fake server adds --latency-ms to every call and answers 429 for --error-rate of them,
+so the legacy run also reports how many calls failed outright.
+Pass --url to point both runs at a real endpoint instead (plain HTTP hides the TLS handshake cost).
+
+Measured with the defaults above (20 ms latency, 5% 429s) on a single core, two runs:
+
+    legacy  p50  817 / 840 ms  p99 1656 / 1735 ms  ~20 req/s   23-24 of 500 failed
+    pooled  p50  160 / 154 ms  p99  797 /  606 ms  152-174 req/s  0 failed
+
+The pooled p99 is dominated by the retry backoff of the throttled calls.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_fake_server(port: int, latency_ms: float, error_rate: float) -> None:
+    app = FastAPI()
+
+    @app.post("/api/v3/embeddings/multimodal")
+    async def embed():
+        await asyncio.sleep(latency_ms / 1000)
+        if random.random() < error_rate:
+            return JSONResponse(status_code=429, content={"error": "rate limited"})
+        return {"data": {"embedding": [random.random() for _ in range(8)]}}
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def bench(mode: str, base_url: str, total: int, concurrency: int) -> dict:
+    from utils.ark_client import ArkClient
+
+    ark = None
+    if mode == "pooled":
+        os.environ["ARK_BASE_URL"] = base_url
+        # An empty key makes an invalid Authorization header; the fake server accepts any
+        os.environ.setdefault("ARK_API_KEY", "bench")
+        ark = ArkClient()
+        ark.start()
+
+    payload = {"model": "fake", "input": [{"type": "text", "text": "hello"}], "instructions": ""}
+    sem = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with sem:
+            start = time.perf_counter()
+            try:
+                if ark:
+                    await ark.post("/embeddings/multimodal", payload)
+                else:
+                    async with httpx.AsyncClient(timeout=300) as client:
+                        r = await client.post(f"{base_url}/embeddings/multimodal", json=payload)
+                        r.raise_for_status()
+            except httpx.HTTPError:
+                failures += 1
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    if ark:
+        await ark.close()
+    return {
+        "mode": mode,
+        "ok": len(latencies),
+        "failed": failures,
+        "p50ms": round(percentile(latencies, 0.5), 1) if latencies else None,
+        "p99ms": round(percentile(latencies, 0.99), 1) if latencies else None,
+        "meanMs": round(statistics.mean(latencies), 1) if latencies else None,
+        "reqPerSec": round(total / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    base_url = args.url
+    if not base_url:
+        threading.Thread(target=run_fake_server, args=(args.port, args.latency_ms, args.error_rate), daemon=True).start()
+        time.sleep(1.0)
+        base_url = f"http://127.0.0.1:{args.port}/api/v3"
+
+    for mode in ("legacy", "pooled"):
+        print(json.dumps(asyncio.run(bench(mode, base_url, args.requests, args.concurrency))))
+
+
+if __name__ == "__main__":
+    main()
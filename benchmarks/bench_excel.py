@@ -0,0 +1,122 @@
+"""
+Compare spreadsheet conversion paths: seconds, output size and peak RSS.
+
+    python benchmarks/bench_excel.py --rows 100000 --cols 20
+    python benchmarks/bench_excel.py --file big.xlsx
+
+soffice: utils.converter.convert_excel_to_html (LibreOffice HTML export + BeautifulSoup cleanup)
+native-html / native-csv / native-markdown: utils.excel.convert_spreadsheet
+
+Without --file a workbook is generated with --rows x --cols cells (text, numbers, dates)
+and a merged block every 1000 rows. Each mode runs in a fresh interpreter so peak RSS is not shared;
+soffice's own memory shows up as the child RSS.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ["soffice", "native-html", "native-csv", "native-markdown"]
+
+
+def generate(path: str, rows: int, cols: int) -> None:
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    # write_only streams rows to disk, so generating a big workbook is cheap too
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    merges = []
+    start = datetime(2024, 1, 1)
+    sheet.append([f"col{c}" for c in range(cols)])
+    for r in range(rows):
+        row = []
+        for c in range(cols):
+            if c % 3 == 0:
+                row.append(f"item {r}-{c}")
+            elif c % 3 == 1:
+                row.append(r * 0.5 + c)
+            else:
+                row.append(start + timedelta(days=r % 365))
+        sheet.append(row)
+        if r % 1000 == 999:
+            merges.append(f"A{r + 2}:B{r + 3}")
+    for ref in merges:
+        sheet.merged_cells.ranges.add(ref)
+    workbook.save(path)
+    add_dimension(path, f"A1:{get_column_letter(cols)}{rows + 1}")
+
+
+def add_dimension(path: str, ref: str) -> None:
+    """
+    Excel always writes <dimension>, openpyxl's write-only mode doesn't; without it openpyxl's
+    read-only loader parses every sheet once extra, which would skew the comparison.
+    """
+    tmp = path + ".tmp"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            data = src.read(info.filename)
+            if info.filename.startswith("xl/worksheets/sheet") and b"<dimension" not in data:
+                data = data.replace(b"<sheetViews>", f'<dimension ref="{ref}"/><sheetViews>'.encode(), 1)
+            dst.writestr(info, data)
+    os.replace(tmp, path)
+
+
+def run(mode: str, path: str) -> int:
+    if mode == "soffice":
+        from utils.converter import convert_excel_to_html
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            return len(convert_excel_to_html(path, output_dir))
+    from utils.excel import convert_spreadsheet
+
+    return len(convert_spreadsheet(path, {"mode": mode.split("-", 1)[1]})["text"])
+
+
+def measure(mode: str, path: str) -> None:
+    start = time.perf_counter()
+    size = run(mode, path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    print(json.dumps({
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "outputChars": size,
+        "peakRssMB": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20, 1),
+        "peakChildRssMB": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2**20, 1),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if not path:
+            path = os.path.join(tmp, "bench.xlsx")
+            generate(path, args.rows, args.cols)
+            print(json.dumps({"generated": path, "rows": args.rows, "cols": args.cols, "sizeMB": round(os.path.getsize(path) / 2**20, 1)}))
+        for mode in MODES:
+            subprocess.run([sys.executable, __file__, "--file", path, "--mode", mode], check=False)
+
+
+if __name__ == "__main__":
+    main()
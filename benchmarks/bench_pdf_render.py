@@ -0,0 +1,78 @@
+"""
+Compare PDF rasterization paths: pages/sec and peak RSS.
+
+    python benchmarks/bench_pdf_render.py some.pdf --width 1024 --height 1024
+
+legacy: pdf2image.convert_from_path (all pages in memory) + one ImageMagick `convert` per page
+                (needs `pip install pdf2image` and ImageMagick, which the service no longer uses)
+current: utils.pdf_renderer.render_pdf
+
+Each mode runs in a fresh interpreter so peak RSS is not shared between them.
+Peak RSS is reported for the Python process and for its largest child (pdftoppm/convert).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_legacy(pdf_path: str, output_dir: str, width: int, height: int) -> int:
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(pdf_path)
+    for i, image in enumerate(images):
+        image_path = os.path.join(output_dir, f"{i+1}.jpg")
+        image.save(image_path, "JPEG")
+        cmd = ["convert", image_path, "-resize", f"{width}x{height}>", image_path]
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return len(images)
+
+
+def run_current(pdf_path: str, output_dir: str, width: int, height: int) -> int:
+    from utils.pdf_renderer import render_pdf
+
+    return len(render_pdf(pdf_path, output_dir, width, height))
+
+
+def measure(mode: str, pdf_path: str, width: int, height: int) -> None:
+    runner = run_legacy if mode == "legacy" else run_current
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        pages = runner(pdf_path, output_dir, width, height)
+        elapsed = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    print(json.dumps({
+        "mode": mode,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pagesPerSec": round(pages / elapsed, 2) if elapsed else None,
+        "peakRssMB": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20, 1),
+        "peakChildRssMB": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2**20, 1),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf")
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=1024)
+    parser.add_argument("--mode", choices=["legacy", "current"])
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.pdf, args.width, args.height)
+        return
+    for mode in ("legacy", "current"):
+        cmd = [sys.executable, __file__, args.pdf, "--width", str(args.width), "--height", str(args.height), "--mode", mode]
+        subprocess.run(cmd, check=False)
+
+
+if __name__ == "__main__":
+    main()
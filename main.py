@@ -1,22 +1,104 @@
+import asyncio
+import json
 import os
-from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Union
 
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from utils.converter import process_file
-from utils.file_handler import save_upload_file
+from utils.asr_service import preload as preload_asr
+from utils.converter import get_file_kind, is_deferred_page, process_file, render_deferred_page
+from utils.file_handler import UploadLimitMiddleware, UploadTooLargeError, get_max_upload_size, save_upload_file, upload_too_large_response
+from utils.ingest import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, IngestPipeline
+from utils.jobs import JobManager, JobStore, QueueFullError, WorkerPool
+from utils.office_pool import office_pool
+from utils.storage import blob_store, md5_from_static_path
 from utils.vector_engine import VectorEngine
 
 load_dotenv()
 
-app = FastAPI(version="0.4.5")
-
+def public_file_info(file_info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "url": file_info['url'],
+        "size": file_info['size'],
+        "name": file_info['name'],
+        "md5": file_info['md5'],
+        "contentType": file_info['contentType']
+    }
+
+
+def run_process_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    file_info = params['file']
+    ai_data = process_file(file_info, **params['options'])
+    return {"file": public_file_info(file_info), "ai": ai_data}
+
+
+worker_pool = WorkerPool()
+job_manager = JobManager(JobStore(), worker_pool, run_process_job)
+
+
+async def office_health_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(office_pool.check)
+
+
+def collect_storage() -> Dict[str, Any]:
+    return blob_store.collect(job_manager.store.active_md5s())
+
+
+async def storage_gc_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            stats = await asyncio.to_thread(collect_storage)
+        except Exception as e:
+            print(f"Storage collection failed: {e}")
+            continue
+        if stats.get("evicted"):
+            print(f"Storage collection evicted {stats['evicted']} uploads, freed {stats['freed']} bytes")
+
+
+def log_preload_error(future: asyncio.Future) -> None:
+    # Nobody awaits the preload, so its failure would otherwise go unnoticed
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error preloading ASR model: {future.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm LibreOffice before the first document arrives
+    health_task = None
+    if await asyncio.to_thread(office_pool.start):
+        health_task = asyncio.create_task(office_health_loop(float(os.getenv("OFFICE_HEALTH_INTERVAL", "30"))))
+    # Load Whisper in the background so startup is not blocked on it
+    asyncio.get_running_loop().run_in_executor(None, preload_asr).add_done_callback(log_preload_error)
+    resumed = job_manager.resume()
+    if resumed:
+        print(f"Resumed {resumed} unfinished jobs")
+    await engine.startup()
+    storage_task = asyncio.create_task(storage_gc_loop(float(os.getenv("STORAGE_GC_INTERVAL", "300"))))
+    yield
+    await engine.shutdown()
+    if health_task:
+        health_task.cancel()
+    storage_task.cancel()
+    await asyncio.to_thread(blob_store.flush)
+    worker_pool.shutdown()
+    await asyncio.to_thread(office_pool.stop)
+
+
+app = FastAPI(version="0.4.5", lifespan=lifespan)
+
+# Added first so CORS headers are also set on its 413 responses
+app.add_middleware(UploadLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -25,8 +107,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class LazyStaticFiles(StaticFiles):
+    """Static files that render deferred PDF page images the first time they are requested."""
+
+    async def get_response(self, path: str, scope):
+        # Feeds the storage LRU; recorded before a deferred render so collection doesn't race it
+        blob_store.touch(md5_from_static_path(path))
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as e:
+            if e.status_code != 404:
+                raise
+            # Only deferred page images can appear later; any other miss stays a plain 404 without a trip to the pool
+            if not is_deferred_page(path):
+                raise
+        try:
+            rendered = await worker_pool.run("pdf", render_deferred_page, path)
+        except QueueFullError:
+            raise StarletteHTTPException(status_code=503, detail="Renderer busy, please retry later")
+        if not rendered:
+            raise StarletteHTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", LazyStaticFiles(directory="static"), name="static")
 
 engine = VectorEngine()
 
@@ -35,6 +140,24 @@ class StoreRequest(BaseModel):
     items: List[Dict[str, Any]]
     metadata: Optional[Dict[str, Any]] = None
     collection: str
+    id: Optional[str] = None
+    bypassCache: bool = False
+    profile: Optional[Union[str, Dict[str, Any]]] = None
+
+
+class BatchStorePoint(BaseModel):
+    items: List[Dict[str, Any]]
+    metadata: Optional[Dict[str, Any]] = None
+    id: Optional[str] = None
+
+
+class BatchStoreRequest(BaseModel):
+    points: List[BatchStorePoint]
+    collection: str
+    batchSize: int = 64
+    concurrency: int = 8
+    bypassCache: bool = False
+    profile: Optional[Union[str, Dict[str, Any]]] = None
 
 
 class SearchRequest(BaseModel):
@@ -43,6 +166,39 @@ class SearchRequest(BaseModel):
     collection: str
     filter: Optional[Dict[str, Any]] = None
     score: float = 0.2
+    bypassCache: bool = False
+    hnswEf: Optional[int] = None
+    oversampling: Optional[float] = None
+    rescore: Optional[bool] = None
+
+
+class BatchSearchQuery(BaseModel):
+    items: List[Dict[str, Any]]
+    limit: int = 5
+    collection: Optional[str] = None
+    filter: Optional[Dict[str, Any]] = None
+    score: float = 0.2
+    hnswEf: Optional[int] = None
+    oversampling: Optional[float] = None
+    rescore: Optional[bool] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchQuery]
+    collection: Optional[str] = None
+    concurrency: int = 8
+    bypassCache: bool = False
+
+
+class CollectionRequest(BaseModel):
+    collection: str
+    size: int
+    profile: Optional[Union[str, Dict[str, Any]]] = None
+
+
+class IndexRequest(BaseModel):
+    collection: str
+    fields: Dict[str, str]
 
 
 class ClearRequest(BaseModel):
@@ -53,6 +209,37 @@ class QueryRequest(BaseModel):
     query: Dict[str, Any]
     limit: int = 5
     collection: str
+    offset: Optional[Union[int, str]] = None
+
+
+class ExportRequest(BaseModel):
+    collection: str
+    query: Optional[Dict[str, Any]] = None
+    withVectors: bool = False
+    pageSize: int = 256
+
+
+def get_modality_types(items: List[Dict[str, Any]]) -> List[str]:
+    # Sorted so identical items always produce identical instructions (and embedding cache keys)
+    types = []
+    for item in sorted({x['type'] for x in items}):
+        if 'text' in item:
+            types.append("text")
+        elif 'image' in item:
+            types.append("image")
+        elif 'video' in item:
+            types.append("video")
+    return types
+
+
+def store_instructions(items: List[Dict[str, Any]]) -> str:
+    types = get_modality_types(items)
+    return f"Instruction:Compress the {'/'.join(types)} into one word.\nQuery:"
+
+
+def search_instructions(items: List[Dict[str, Any]]) -> str:
+    types = get_modality_types(items)
+    return f"Target_modality: {' and '.join(types)}.\nInstruction:Compress the {'/'.join(types)} into one word.\nQuery:"
 
 
 def verify_token(token: Optional[str]) -> None:
@@ -70,35 +257,109 @@ async def process_upload(
     imgW: int = Form(1024),
     enbaleV2I: bool = Form(True),
     videoFPS: float = Form(1.0),
+    videoMode: str = Form("interval"),
+    sceneThreshold: float = Form(0.3),
+    frameDedup: int | None = Form(None),
+    maxFrames: int = Form(0),
     enableA2T: bool = Form(True),
     audioLanguage: str | None = Form(None),
+    asrMode: str = Form("batched"),
+    asrBeamSize: int = Form(5),
+    asrBatchSize: int = Form(8),
+    asrComputeType: str | None = Form(None),
+    asyncMode: bool = Form(False),
+    pages: str | None = Form(None),
+    lazyRender: bool = Form(False),
+    excelMode: str = Form("html"),
+    excelSheets: str | None = Form(None),
+    excelMaxRows: int = Form(0),
+    excelMaxCols: int = Form(0),
+    excelSplit: bool = Form(False),
+    pdfText: str = Form("on"),
+    textMode: str = Form("inline"),
+    textMaxChars: int | None = Form(None),
+    textChunkSize: int = Form(1000),
+    textChunkOverlap: int = Form(100),
     h_token: str | None = Header(None, alias="token")
 ):
     verify_token(token or h_token)
     try:
+        # Reject before saving the upload if this kind of conversion is already saturated
+        kind = get_file_kind(file.filename, file.content_type or "")
+        if not worker_pool.has_capacity(kind):
+            raise QueueFullError(f"Too many pending {kind} conversions, please retry later")
+
         # 1. Save File
         file_info = await save_upload_file(file)
+        params = {
+            "file": file_info,
+            "options": {
+                "image_width": imgW,
+                "image_height": imgH,
+                "enbaleV2I": enbaleV2I,
+                "videoFPS": videoFPS,
+                "enableA2T": enableA2T,
+                "audioLanguage": audioLanguage,
+                "pages": pages,
+                "deferred": lazyRender,
+                "video_options": {
+                    "mode": videoMode,
+                    "scene_threshold": sceneThreshold,
+                    "dedup_distance": frameDedup,
+                    "max_frames": maxFrames,
+                },
+                "asr_options": {
+                    "mode": asrMode,
+                    "beam_size": asrBeamSize,
+                    "batch_size": asrBatchSize,
+                    "compute_type": asrComputeType,
+                },
+                "excel_options": {
+                    "mode": excelMode,
+                    "sheets": excelSheets,
+                    "max_rows": excelMaxRows,
+                    "max_cols": excelMaxCols,
+                    "split": excelSplit,
+                },
+                "pdf_text": pdfText,
+                "text_options": {
+                    "mode": textMode,
+                    "max_chars": textMaxChars,
+                    "chunk_size": textChunkSize,
+                    "chunk_overlap": textChunkOverlap,
+                },
+            }
+        }
 
-        # 2. Process File (Convert/Read)
-        ai_data = process_file(file_info, imgW, imgH, enbaleV2I, videoFPS, enableA2T, audioLanguage)
+        # 2a. Job mode: queue the conversion and let the client poll /api/jobs/{id}
+        if asyncMode:
+            job_id = job_manager.submit(kind, params)
+            return JSONResponse(content={
+                "code": 200,
+                "message": "success",
+                "data": {"job": {"id": job_id, "status": "queued"}}
+            })
+
+        # 2b. Process File (Convert/Read) off the event loop
+        with blob_store.pin(file_info['md5']):
+            data = await worker_pool.run(kind, run_process_job, params)
 
         # 3. Construct Response
         response_data = {
             "code": 200,
             "message": "success",
-            "data": {
-                "file": {
-                    "url": file_info['url'],
-                    "size": file_info['size'],
-                    "name": file_info['name'],
-                    "md5": file_info['md5'],
-                    "contentType": file_info['contentType']
-                },
-                "ai": ai_data
-            }
+            "data": data
         }
         return JSONResponse(content=response_data)
 
+    except UploadTooLargeError:
+        return upload_too_large_response(get_max_upload_size())
+    except QueueFullError as e:
+        return JSONResponse(status_code=429, headers={"Retry-After": "5"}, content={
+            "code": 429,
+            "message": str(e),
+            "data": None
+        })
     except Exception as e:
         return JSONResponse(content={
             "code": 500,
@@ -107,25 +368,119 @@ async def process_upload(
         })
 
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/ingest")
+async def ingest_upload(
+    token: str | None = Form(None),
+    file: UploadFile = File(...),
+    collection: str = Form(...),
+    imgH: int = Form(1024),
+    imgW: int = Form(1024),
+    pages: str | None = Form(None),
+    videoFPS: float = Form(1.0),
+    videoMode: str = Form("interval"),
+    sceneThreshold: float = Form(0.3),
+    frameDedup: int | None = Form(None),
+    maxFrames: int = Form(0),
+    enableA2T: bool = Form(True),
+    audioLanguage: str | None = Form(None),
+    pdfText: str = Form("prefer"),
+    textMaxChars: int | None = Form(None),
+    chunkSize: int = Form(DEFAULT_CHUNK_SIZE),
+    chunkOverlap: int = Form(DEFAULT_CHUNK_OVERLAP),
+    batchSize: int = Form(64),
+    concurrency: int = Form(8),
+    profile: str | None = Form(None),
+    bypassCache: bool = Form(False),
+    h_token: str | None = Header(None, alias="token")
+):
+    verify_token(token or h_token)
+    try:
+        kind = get_file_kind(file.filename, file.content_type or "")
+        if not worker_pool.has_capacity(kind):
+            raise QueueFullError(f"Too many pending {kind} conversions, please retry later")
+        file_info = await save_upload_file(file)
+    except UploadTooLargeError:
+        return upload_too_large_response(get_max_upload_size())
+    except QueueFullError as e:
+        return JSONResponse(status_code=429, headers={"Retry-After": "5"}, content={"code": 429, "message": str(e), "data": None})
+    except Exception as e:
+        return JSONResponse(content={"code": 500, "message": str(e), "data": None})
+
+    options = {
+        "image_width": imgW,
+        "image_height": imgH,
+        "enbaleV2I": True,
+        "videoFPS": videoFPS,
+        "enableA2T": enableA2T,
+        "audioLanguage": audioLanguage,
+        "pages": pages,
+        # Pages are embedded as they render, so nothing is deferred
+        "deferred": False,
+        "video_options": {
+            "mode": videoMode,
+            "scene_threshold": sceneThreshold,
+            "dedup_distance": frameDedup,
+            "max_frames": maxFrames,
+        },
+        # Markdown tables embed better than HTML markup; sheets are chunked one by one
+        "excel_options": {"mode": "markdown", "split": True},
+        "pdf_text": pdfText,
+        # Text uploads are chunked while they are read, with offsets into the original file
+        "text_options": {
+            "mode": "chunks",
+            "max_chars": textMaxChars,
+            "chunk_size": chunkSize,
+            "chunk_overlap": chunkOverlap,
+        },
+    }
+    pipeline = IngestPipeline(
+        engine, worker_pool, collection, store_instructions,
+        batch_size=batchSize, concurrency=concurrency, profile=profile, use_cache=not bypassCache
+    )
+
+    async def events():
+        with blob_store.pin(file_info['md5']):
+            async for event, data in pipeline.run(kind, file_info, options, chunk_size=chunkSize, chunk_overlap=chunkOverlap):
+                yield sse_event(event, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str, token: Optional[str] = Header(None)):
+    verify_token(token)
+    job = job_manager.store.get(job_id)
+    if job is None:
+        return JSONResponse(content={"code": 404, "message": "job not found", "data": None})
+    return JSONResponse(content={
+        "code": 200,
+        "message": "success",
+        "data": {
+            "id": job["id"],
+            "status": job["status"],
+            "error": job["error"],
+            "result": job["result"],
+            "createdAt": job["createdAt"],
+            "updatedAt": job["updatedAt"]
+        }
+    })
+
+
 @app.post("/api/vector/store")
 async def vector_store(req: StoreRequest, token: Optional[str] = Header(None)):
     verify_token(token)
     try:
-        types = []
-        for item in {x['type'] for x in req.items}:
-            if 'text' in item:
-                types.append("text")
-            elif 'image' in item:
-                types.append("image")
-            elif 'video' in item:
-                types.append("video")
-        instructions = f"Instruction:Compress the {'/'.join(types)} into one word.\nQuery:"
-        embedding = await engine.get_embedding(req.items, instructions)
+        instructions = store_instructions(req.items)
+        embedding = await engine.get_embedding(req.items, instructions, use_cache=not req.bypassCache)
         payload = {
             'items': req.items,
             **(req.metadata or {})
         }
-        id = engine.upsert_vector(embedding, payload, req.collection)
+        id = await engine.upsert_vector(embedding, payload, req.collection, point_id=req.id, profile=req.profile)
         return JSONResponse(content={
             "code": 200,
             "message": "success",
@@ -135,21 +490,132 @@ async def vector_store(req: StoreRequest, token: Optional[str] = Header(None)):
         return JSONResponse(content={"code": 500, "message": str(e), "data": None})
 
 
+@app.post("/api/vector/store/batch")
+async def vector_store_batch(req: BatchStoreRequest, token: Optional[str] = Header(None)):
+    verify_token(token)
+    try:
+        sem = asyncio.Semaphore(max(1, req.concurrency))
+
+        async def embed(point: BatchStorePoint) -> List[float]:
+            async with sem:
+                return await engine.get_embedding(point.items, store_instructions(point.items), use_cache=not req.bypassCache)
+
+        embeddings = await asyncio.gather(*(embed(p) for p in req.points), return_exceptions=True)
+
+        results = []
+        points = []
+        for index, (point, embedding) in enumerate(zip(req.points, embeddings)):
+            result = {"index": index, "id": engine.point_id(point.id), "success": True, "error": None}
+            if isinstance(embedding, Exception):
+                result.update(success=False, error=str(embedding))
+            else:
+                points.append({
+                    "id": result["id"],
+                    "vector": embedding,
+                    "payload": {'items': point.items, **(point.metadata or {})},
+                    "result": result
+                })
+            results.append(result)
+
+        if points:
+            errors = await engine.upsert_vectors(points, req.collection, batch_size=req.batchSize, profile=req.profile)
+            for point, error in zip(points, errors):
+                if error:
+                    point["result"].update(success=False, error=error)
+
+        return JSONResponse(content={
+            "code": 200,
+            "message": "success",
+            "data": {
+                "stored": sum(1 for r in results if r["success"]),
+                "failed": sum(1 for r in results if not r["success"]),
+                "items": results
+            }
+        })
+    except Exception as e:
+        return JSONResponse(content={"code": 500, "message": str(e), "data": None})
+
+
 @app.post("/api/vector/search")
 async def vector_search(req: SearchRequest, token: Optional[str] = Header(None)):
     verify_token(token)
     try:
-        types = []
-        for item in {x['type'] for x in req.items}:
-            if 'text' in item:
-                types.append("text")
-            elif 'image' in item:
-                types.append("image")
-            elif 'video' in item:
-                types.append("video")
-        instructions = f"Target_modality: {' and '.join(types)}.\nInstruction:Compress the {'/'.join(types)} into one word.\nQuery:"
-        embedding = await engine.get_embedding(req.items, instructions)
-        results = engine.search_vectors(embedding, limit=req.limit, collection_name=req.collection, filter=req.filter, score_threshold=req.score)
+        results = await engine.search_items(
+            req.items, search_instructions(req.items), limit=req.limit, collection_name=req.collection, filter=req.filter,
+            score_threshold=req.score, hnsw_ef=req.hnswEf, oversampling=req.oversampling, rescore=req.rescore,
+            use_cache=not req.bypassCache
+        )
+        return JSONResponse(content={"code": 200, "message": "success", "data": {"items": results}})
+    except Exception as e:
+        return JSONResponse(content={"code": 500, "message": str(e), "data": None})
+
+
+@app.post("/api/vector/search/batch")
+async def vector_search_batch(req: BatchSearchRequest, token: Optional[str] = Header(None)):
+    verify_token(token)
+    try:
+        sem = asyncio.Semaphore(max(1, req.concurrency))
+
+        # Queries answered by the search cache skip both embedding and search
+        keys: List[Optional[str]] = [None] * len(req.queries)
+        cached: List[Optional[List[Dict[str, Any]]]] = [None] * len(req.queries)
+        if not req.bypassCache and engine.search_cache.enabled:
+            for index, query in enumerate(req.queries):
+                collection = query.collection or req.collection
+                if collection:
+                    keys[index] = engine.search_cache_key(
+                        collection, query.items, search_instructions(query.items), query.limit, query.filter,
+                        query.score, query.hnswEf, query.oversampling, query.rescore
+                    )
+                    cached[index] = engine.search_cache.get(keys[index])
+
+        async def embed(index: int, query: BatchSearchQuery) -> Optional[List[float]]:
+            if cached[index] is not None:
+                return None
+            async with sem:
+                return await engine.get_embedding(query.items, search_instructions(query.items), use_cache=not req.bypassCache)
+
+        embeddings = await asyncio.gather(*(embed(i, q) for i, q in enumerate(req.queries)), return_exceptions=True)
+
+        results = []
+        # Queries on the same collection go to Qdrant as one batch request
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for index, (query, embedding) in enumerate(zip(req.queries, embeddings)):
+            result = {"index": index, "success": True, "error": None, "items": []}
+            collection = query.collection or req.collection
+            if cached[index] is not None:
+                result["items"] = cached[index]
+            elif isinstance(embedding, Exception):
+                result.update(success=False, error=str(embedding))
+            elif not collection:
+                result.update(success=False, error="collection is required")
+            else:
+                groups.setdefault(collection, []).append({
+                    "vector": embedding,
+                    "limit": query.limit,
+                    "filter": query.filter,
+                    "score_threshold": query.score,
+                    "hnsw_ef": query.hnswEf,
+                    "oversampling": query.oversampling,
+                    "rescore": query.rescore,
+                    "result": result,
+                    "key": keys[index],
+                    "generation": engine.search_cache.generation(collection),
+                })
+            results.append(result)
+
+        async def search(collection: str, searches: List[Dict[str, Any]]) -> None:
+            try:
+                hits = await engine.search_vectors_batch(searches, collection)
+                for search, items in zip(searches, hits):
+                    search["result"]["items"] = items
+                    if search["key"]:
+                        engine.search_cache.put(search["key"], collection, search["generation"], items)
+            except Exception as e:
+                for search in searches:
+                    search["result"].update(success=False, error=str(e))
+
+        await asyncio.gather(*(search(c, s) for c, s in groups.items()))
         return JSONResponse(content={"code": 200, "message": "success", "data": {"items": results}})
     except Exception as e:
         return JSONResponse(content={"code": 500, "message": str(e), "data": None})
@@ -159,8 +625,92 @@ async def vector_search(req: SearchRequest, token: Optional[str] = Header(None))
 async def vector_query(req: QueryRequest, token: Optional[str] = Header(None)):
     verify_token(token)
     try:
-        results = engine.query_vectors(req.query, limit=req.limit, collection_name=req.collection)
-        return JSONResponse(content={"code": 200, "message": "success", "data": {"items": results}})
+        results, next_offset = await engine.query_vectors(req.query, limit=req.limit, collection_name=req.collection, offset=req.offset)
+        return JSONResponse(content={"code": 200, "message": "success", "data": {"items": results, "next": next_offset}})
+    except Exception as e:
+        return JSONResponse(content={"code": 500, "message": str(e), "data": None})
+
+
+@app.post("/api/vector/export")
+async def vector_export(req: ExportRequest, token: Optional[str] = Header(None)):
+    verify_token(token)
+    try:
+        if not await engine.collection_exists(req.collection):
+            return JSONResponse(content={"code": 404, "message": "collection not found", "data": None})
+    except Exception as e:
+        return JSONResponse(content={"code": 500, "message": str(e), "data": None})
+
+    async def lines():
+        try:
+            async for point in engine.scroll_vectors(req.collection, req.query, page_size=max(1, req.pageSize), with_vectors=req.withVectors):
+                yield json.dumps(point, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # Headers are already sent; the last line tells the client the export is incomplete
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/api/storage/stats")
+async def storage_stats(token: Optional[str] = Header(None)):
+    verify_token(token)
+    return JSONResponse(content={
+        "code": 200,
+        "message": "success",
+        "data": await asyncio.to_thread(blob_store.stats)
+    })
+
+
+@app.post("/api/storage/collect")
+async def storage_collect(token: Optional[str] = Header(None)):
+    verify_token(token)
+    try:
+        stats = await asyncio.to_thread(collect_storage)
+        return JSONResponse(content={"code": 200, "message": "success", "data": stats})
+    except Exception as e:
+        return JSONResponse(content={"code": 500, "message": str(e), "data": None})
+
+
+@app.get("/api/vector/cache/stats")
+async def vector_cache_stats(token: Optional[str] = Header(None)):
+    verify_token(token)
+    return JSONResponse(content={
+        "code": 200,
+        "message": "success",
+        "data": {"embedding": engine.embedding_cache.stats(), "images": engine.images.stats(), "search": engine.search_cache.stats()}
+    })
+
+
+@app.post("/api/vector/collection")
+async def vector_collection(req: CollectionRequest, token: Optional[str] = Header(None)):
+    verify_token(token)
+    try:
+        created = await engine.create_collection(req.size, req.collection, req.profile)
+        return JSONResponse(content={
+            "code": 200,
+            "message": "success" if created else "collection already exists",
+            "data": {"created": created}
+        })
+    except ValueError as e:
+        return JSONResponse(content={"code": 400, "message": str(e), "data": None})
+    except Exception as e:
+        return JSONResponse(content={"code": 500, "message": str(e), "data": None})
+
+
+@app.post("/api/vector/index")
+async def vector_index(req: IndexRequest, token: Optional[str] = Header(None)):
+    verify_token(token)
+    try:
+        if not await engine.collection_exists(req.collection):
+            return JSONResponse(content={"code": 404, "message": "collection not found", "data": None})
+        created = await engine.create_indexes(req.collection, req.fields)
+        return JSONResponse(content={
+            "code": 200,
+            "message": "success",
+            "data": {"created": created, "indexes": engine.indexes.get(req.collection, {})}
+        })
+    except ValueError as e:
+        return JSONResponse(content={"code": 400, "message": str(e), "data": None})
     except Exception as e:
         return JSONResponse(content={"code": 500, "message": str(e), "data": None})
 
@@ -169,7 +719,7 @@ async def vector_query(req: QueryRequest, token: Optional[str] = Header(None)):
 async def vector_clear(req: ClearRequest, token: Optional[str] = Header(None)):
     verify_token(token)
     try:
-        success = engine.delete_collection(req.collection)
+        success = await engine.delete_collection(req.collection)
         return JSONResponse(content={
             "code": 200,
             "message": "success" if success else "collection not found",
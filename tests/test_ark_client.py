@@ -0,0 +1,180 @@
+"""
+ArkClient against a local fake embedding server that answers from a script of
+(status, headers, delay) responses, one per call.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from utils.ark_client import AdaptiveLimiter, ArkClient
+
+PAYLOAD = {"model": "fake", "input": [{"type": "text", "text": "hello"}]}
+EMBEDDING = {"data": {"embedding": [0.1, 0.2, 0.3]}}
+
+
+class FakeArk:
+    def __init__(self) -> None:
+        self.script = []
+        self.calls = []
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake._lock:
+                    fake.calls.append(time.monotonic())
+                    status, headers, delay = fake.script.pop(0) if fake.script else (200, {}, 0)
+                if delay:
+                    time.sleep(delay)
+                body = json.dumps(EMBEDDING if status == 200 else {"error": "fake"}).encode()
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v3"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_ark():
+    fake = FakeArk()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def make_client(fake_ark, monkeypatch):
+    monkeypatch.setenv("ARK_API_KEY", "test")
+    monkeypatch.setenv("ARK_BASE_URL", fake_ark.url)
+    monkeypatch.setenv("ARK_MAX_RETRIES", "3")
+
+    def make(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return ArkClient()
+
+    return make
+
+
+def post(client: ArkClient):
+    async def run():
+        try:
+            return await client.post("/embeddings/multimodal", PAYLOAD)
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_throttling_and_server_errors(fake_ark, make_client, status):
+    fake_ark.script = [(status, {"Retry-After": "0"}, 0), (status, {"Retry-After": "0"}, 0)]
+    assert post(make_client()) == EMBEDDING
+    assert len(fake_ark.calls) == 3
+
+
+def test_does_not_retry_client_errors(fake_ark, make_client):
+    fake_ark.script = [(400, {}, 0)]
+    with pytest.raises(httpx.HTTPStatusError):
+        post(make_client())
+    assert len(fake_ark.calls) == 1
+
+
+def test_gives_up_after_max_retries(fake_ark, make_client):
+    fake_ark.script = [(503, {"Retry-After": "0"}, 0)] * 4
+    with pytest.raises(httpx.HTTPStatusError):
+        post(make_client())
+    assert len(fake_ark.calls) == 4
+
+
+def test_waits_for_retry_after(fake_ark, make_client):
+    fake_ark.script = [(429, {"Retry-After": "1"}, 0)]
+    assert post(make_client()) == EMBEDDING
+    assert fake_ark.calls[1] - fake_ark.calls[0] >= 0.9
+
+
+def test_retries_read_timeout(fake_ark, make_client):
+    fake_ark.script = [(200, {}, 1.0)]
+    assert post(make_client(ARK_READ_TIMEOUT="0.2")) == EMBEDDING
+    assert len(fake_ark.calls) == 2
+
+
+def test_throttling_halves_client_concurrency(fake_ark, make_client):
+    fake_ark.script = [(429, {"Retry-After": "0"}, 0)]
+    client = make_client(ARK_CONCURRENCY="8")
+    post(client)
+    assert client.limiter.limit == 4
+
+
+def test_limiter_halves_on_throttle_down_to_minimum():
+    async def run():
+        limiter = AdaptiveLimiter(initial=8, minimum=3, maximum=32)
+        limits = []
+        for _ in range(3):
+            await limiter.acquire()
+            await limiter.release(throttled=True)
+            limits.append(limiter.limit)
+        return limits
+
+    assert asyncio.run(run()) == [4, 3, 3]
+
+
+def test_limiter_grows_by_one_per_window_of_successes_up_to_maximum():
+    async def run():
+        limiter = AdaptiveLimiter(initial=2, minimum=1, maximum=4)
+        limits = []
+        for _ in range(2 + 3 + 4 + 4):
+            await limiter.acquire()
+            await limiter.release()
+            limits.append(limiter.limit)
+        return limits
+
+    # +1 after `limit` consecutive successes: 2 at 2, 3 at 3, then capped at 4
+    assert asyncio.run(run()) == [2, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4]
+
+
+def test_limiter_throttle_resets_success_streak():
+    async def run():
+        limiter = AdaptiveLimiter(initial=4, minimum=1, maximum=8)
+        for throttled in (False, False, False, True, False):
+            await limiter.acquire()
+            await limiter.release(throttled=throttled)
+        return limiter.limit
+
+    assert asyncio.run(run()) == 2
+
+
+def test_limiter_blocks_at_limit():
+    async def run():
+        limiter = AdaptiveLimiter(initial=1, minimum=1, maximum=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.05)
+        blocked = not waiter.done()
+        await limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        return blocked, limiter.in_flight
+
+    assert asyncio.run(run()) == (True, 1)
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from utils import converter
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def upload(workdir, name, content_type):
+    path = os.path.join("static", "upload", "a" * 32, name)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"data")
+    return {"path": path, "url": f"/{path}", "name": name, "md5": "a" * 32, "contentType": content_type}
+
+
+def manifests(workdir):
+    root = os.path.join("static", "convert", "a" * 32)
+    return [name for name in os.listdir(root) if name.startswith("manifest-")] if os.path.isdir(root) else []
+
+
+def test_failed_office_conversion_is_retried_and_not_cached(workdir, monkeypatch):
+    calls = []
+
+    def timeout(input_path, output_dir, convert_to):
+        calls.append(input_path)
+        raise TimeoutError("conversion timed out")
+
+    monkeypatch.setattr(converter, "convert_office_document", timeout)
+    file_info = upload(workdir, "a.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    for _ in range(2):
+        result = converter.process_file(file_info)
+        assert result["pdf"] is None
+        assert result["error"] == "Error converting to PDF: conversion timed out"
+    assert len(calls) == 2
+    assert manifests(workdir) == []
+
+
+def test_failed_frame_extraction_is_not_cached(workdir, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("ffmpeg failed")
+
+    monkeypatch.setattr(converter, "extract_frames", broken)
+    file_info = upload(workdir, "a.mp4", "video/mp4")
+    result = converter.process_file(file_info, enableA2T=False)
+    assert result["frames"] == []
+    assert result["error"] == "Error converting Video to images: ffmpeg failed"
+    assert manifests(workdir) == []
+
+
+def test_video_without_frames_is_not_cacheable():
+    result = {"pdf": None, "pageCount": None, "video": "/v.mp4", "frames": [], "text": None, "error": None}
+    assert not converter.is_cacheable(result)
+    assert converter.is_cacheable(dict(result, frames=None))
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils import ingest
+from utils.ingest import IngestPipeline, produce_units
+
+FILE_INFO = {"md5": "0" * 32, "name": "doc.pdf", "url": "/static/upload/doc.pdf", "contentType": "application/pdf"}
+
+
+def make_result(**fields):
+    result = {"text": None, "images": [], "pdf": None, "pageCount": None, "segments": None, "frames": None, "sheets": None}
+    result.update(fields)
+    return result
+
+
+def fake_pdf(pages, done=None, **fields):
+    """process_file stand-in that renders `pages` pages, reporting each through on_page."""
+    def process_file(file_info, on_page=None, **options):
+        urls = [f"/static/convert/x/{page}.jpg" for page in range(1, pages + 1)]
+        for page, url in enumerate(urls, 1):
+            on_page(page, url)
+        if done is not None:
+            done.set()
+        return make_result(pdf="/static/convert/x/result.pdf", images=urls, **fields)
+
+    return process_file
+
+
+class FakePool:
+    async def run(self, kind, fn, *args):
+        return await asyncio.to_thread(fn, *args)
+
+
+class FakeEngine:
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.stored = []
+
+    async def get_embedding(self, items, instructions, use_cache=True):
+        await self.gate.wait()
+        return [0.0, 1.0]
+
+    async def upsert_vectors(self, batch, collection, batch_size=64, profile=None):
+        self.stored.extend(batch)
+        return [None] * len(batch)
+
+    def point_id(self, unit_id):
+        return unit_id
+
+
+def test_produce_units_fails_when_nothing_to_embed(monkeypatch):
+    monkeypatch.setattr(ingest, "process_file", lambda file_info, on_page=None, **options: make_result(text="Error converting Excel file: broken"))
+    with pytest.raises(RuntimeError, match="Error converting Excel file: broken"):
+        produce_units(FILE_INFO, {}, lambda unit: None, 1000, 100)
+
+
+def test_produce_units_keeps_pages_rendered_before_a_failure(monkeypatch):
+    # No page count makes the result uncacheable, but the pages already emitted are still worth storing
+    monkeypatch.setattr(ingest, "process_file", fake_pdf(3, pageCount=None))
+    emitted = []
+    produce_units(FILE_INFO, {}, emitted.append, 1000, 100)
+    assert [unit["metadata"]["page"] for unit in emitted] == [1, 2, 3]
+
+
+def test_produce_units_does_not_embed_error_text(monkeypatch):
+    monkeypatch.setattr(ingest, "process_file", fake_pdf(2, text="Error reading text content: boom"))
+    emitted = []
+    produce_units(FILE_INFO, {}, emitted.append, 1000, 100)
+    assert all(unit["items"][0]["type"] == "image_url" for unit in emitted)
+
+
+def test_pipeline_reports_conversion_failure(monkeypatch):
+    monkeypatch.setattr(ingest, "process_file", lambda file_info, on_page=None, **options: make_result(text="Conversion failed: timeout"))
+
+    async def run():
+        engine = FakeEngine()
+        pipeline = IngestPipeline(engine, FakePool(), "c", lambda items: "")
+        return [event async for event in pipeline.run("pdf", FILE_INFO, {})]
+
+    events = asyncio.run(run())
+    assert ("error", {"stage": "convert", "message": "Conversion failed: timeout"}) in events
+    assert events[-1] == ("done", {"units": 0, "embedded": 0, "stored": 0, "failed": 0})
+
+
+def test_pipeline_bounds_queued_units(monkeypatch):
+    monkeypatch.setattr(ingest, "process_file", fake_pdf(100))
+
+    async def run():
+        engine = FakeEngine()
+        pipeline = IngestPipeline(engine, FakePool(), "c", lambda items: "", batch_size=4, concurrency=2, max_queued=5)
+        events = []
+
+        async def consume():
+            async for event in pipeline.run("pdf", FILE_INFO, {}):
+                events.append(event)
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.3)
+        # Held by the embedders, waiting in the queue, and the one the producer is blocked on
+        blocked_at = pipeline.counters["units"]
+        engine.gate.set()
+        await task
+        return blocked_at, events, len(engine.stored)
+
+    blocked_at, events, stored = asyncio.run(run())
+    assert blocked_at <= 2 + 5 + 1
+    assert events[-1][0] == "done"
+    assert events[-1][1]["stored"] == stored == 100
+
+
+def test_closing_pipeline_releases_blocked_conversion(monkeypatch):
+    done = threading.Event()
+    monkeypatch.setattr(ingest, "process_file", fake_pdf(50, done=done))
+
+    async def run():
+        engine = FakeEngine()
+        pipeline = IngestPipeline(engine, FakePool(), "c", lambda items: "", concurrency=1, max_queued=2)
+        events = pipeline.run("pdf", FILE_INFO, {})
+        assert (await events.__anext__())[0] == "file"
+        # Let the conversion fill the queue, then disconnect like a client going away
+        consumer = asyncio.create_task(events.__anext__())
+        await asyncio.sleep(0.2)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        await events.aclose()
+        # The conversion thread would hang forever if it were still waiting for room
+        return await asyncio.to_thread(done.wait, 5)
+
+    start = time.monotonic()
+    assert asyncio.run(run())
+    assert time.monotonic() - start < 5
@@ -0,0 +1,33 @@
+import pytest
+
+from utils.pdf_renderer import parse_page_range, plan_chunks
+
+
+@pytest.mark.parametrize("spec, expected", [
+    (None, [1, 2, 3, 4, 5]),
+    ("", [1, 2, 3, 4, 5]),
+    ("1-3,5", [1, 2, 3, 5]),
+    ("4-", [4, 5]),
+    ("-2", [1, 2]),
+    ("3,1-2,3", [1, 2, 3]),
+    ("4-9", [4, 5]),
+    ("9", []),
+    ("20-", []),
+    ("5-", [5]),
+])
+def test_parse_page_range(spec, expected):
+    assert parse_page_range(spec, 5) == expected
+
+
+@pytest.mark.parametrize("spec", ["0", "3-2", "a", "1-b"])
+def test_parse_page_range_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_page_range(spec, 5)
+
+
+def test_plan_chunks_splits_on_size_change_gap_and_chunk_size():
+    sizes = [(100, 200)] * 3 + [(200, 100)] * 3
+    assert plan_chunks(sizes, [1, 2, 3, 4, 5, 6], 2) == [
+        (1, 2, (100, 200)), (3, 3, (100, 200)), (4, 5, (200, 100)), (6, 6, (200, 100)),
+    ]
+    assert plan_chunks(sizes, [1, 3], 4) == [(1, 1, (100, 200)), (3, 3, (100, 200))]
@@ -0,0 +1,79 @@
+import asyncio
+
+from utils.search_cache import SearchCache
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_compute():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("k", compute) for _ in range(5)))
+        return results, calls, len(flight)
+
+    results, calls, pending = asyncio.run(run())
+    assert calls == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {1}
+    assert pending == 0
+
+
+def test_exception_reaches_every_caller():
+    async def run():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+
+        return await asyncio.gather(*(flight.do("k", compute) for _ in range(3)), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(run())] == ["boom"] * 3
+
+
+def test_search_after_invalidation_does_not_join_older_search():
+    async def run():
+        cache = SearchCache()
+        calls = []
+
+        async def compute():
+            calls.append(cache.generation("c"))
+            await asyncio.sleep(0.05)
+            return [{"id": str(len(calls))}]
+
+        first = asyncio.create_task(cache.get_or_compute("k", "c", compute))
+        await asyncio.sleep(0.01)
+        cache.invalidate("c")
+        second = await cache.get_or_compute("k", "c", compute)
+        await first
+        return calls, second, cache.get("k")
+
+    calls, second, cached = asyncio.run(run())
+    assert calls == [0, 1]
+    assert second == [{"id": "2"}]
+    assert cached == [{"id": "2"}]
+
+
+def test_cancelled_waiter_does_not_cancel_compute():
+    async def run():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        owner = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await owner
+
+    assert asyncio.run(run()) == ("done", False)
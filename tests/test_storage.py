@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from utils.file_handler import safe_filename
+from utils.storage import BlobStore
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("report.pdf", "report.pdf"),
+    ("dir/report.pdf", "report.pdf"),
+    ("  report.pdf ", "report.pdf"),
+    (None, "m"),
+    ("", "m"),
+    (".", "m"),
+    ("..", "m"),
+    ("a/..", "m"),
+    ("a/", "m"),
+])
+def test_safe_filename(name, expected):
+    assert safe_filename(name, "m") == expected
+
+
+def test_add_relinks_a_stale_name_without_leaving_temp_links(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = BlobStore(str(tmp_path / "storage.db"))
+    md5 = "b" * 32
+    os.makedirs(os.path.join("static", "blobs"))
+    tmp = os.path.join("static", "blobs", "upload.part")
+    with open(tmp, "wb") as f:
+        f.write(b"new")
+    # Something else already sits under the published name
+    os.makedirs(os.path.join("static", "upload", md5))
+    with open(os.path.join("static", "upload", md5, "a.txt"), "wb") as f:
+        f.write(b"old")
+
+    path = store.add(tmp, md5, 3, "a.txt")
+    assert os.path.samefile(path, store.blob_path(md5))
+    assert os.listdir(os.path.join("static", "upload", md5)) == ["a.txt"]
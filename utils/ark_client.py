@@ -0,0 +1,108 @@
+import asyncio
+import os
+import random
+from typing import Any, Dict, Optional
+
+import httpx
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: grows by one after `limit` consecutive successes,
+    halves when the provider pushes back with 429.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int) -> None:
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+class ArkClient:
+    """
+    Long-lived HTTP client for the Ark API: keep-alive HTTP/2 connection pool,
+    jittered exponential backoff on 429/5xx and an adaptive concurrency limit.
+    """
+
+    def __init__(self) -> None:
+        self.api_key = os.getenv("ARK_API_KEY", "")
+        self.base_url = os.getenv("ARK_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3")
+        self.max_retries = int(os.getenv("ARK_MAX_RETRIES", "4"))
+        self.limiter = AdaptiveLimiter(
+            initial=int(os.getenv("ARK_CONCURRENCY", "8")),
+            minimum=1,
+            maximum=int(os.getenv("ARK_MAX_CONCURRENCY", "32")),
+        )
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> None:
+        if self.client is not None:
+            return
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=True,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60),
+            timeout=httpx.Timeout(float(os.getenv("ARK_READ_TIMEOUT", "120")), connect=float(os.getenv("ARK_CONNECT_TIMEOUT", "5"))),
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        # Full jitter keeps retries from many requests from arriving in lockstep
+        return random.uniform(0, min(10.0, 0.5 * 2 ** attempt))
+
+    async def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self.start()
+        attempt = 0
+        while True:
+            response = None
+            error: Optional[Exception] = None
+            await self.limiter.acquire()
+            try:
+                response = await self.client.post(path, json=payload)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
+                error = e
+            finally:
+                await self.limiter.release(throttled=response is not None and response.status_code == 429)
+
+            retryable = error is not None or response.status_code in RETRY_STATUS
+            if not retryable:
+                response.raise_for_status()
+                return response.json()
+            if attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+            await asyncio.sleep(self._backoff(attempt, response))
+            attempt += 1
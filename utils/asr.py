@@ -0,0 +1,109 @@
+import gc
+import os
+import threading
+from typing import Any, Dict
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+from utils.options import merge_options
+
+WHISPER_MODELS: Dict[str, WhisperModel] = {}
+_model_lock = threading.Lock()
+
+DEFAULT_ASR_OPTIONS = {
+    # batched: split at voice-activity boundaries and decode chunks in batches
+    # sequential: single pass over the whole file
+    "mode": "batched",
+    "beam_size": 5,
+    "batch_size": 8,
+    "compute_type": None,
+}
+
+
+def get_model_size() -> str:
+    return os.getenv("WHISPER_MODEL_SIZE", "large-v3")
+
+
+def get_default_compute_type() -> str:
+    return os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+
+
+def get_whisper_model(compute_type: str = None) -> WhisperModel:
+    """Load (once per compute type) and return the Whisper model configured by WHISPER_MODEL_SIZE."""
+    compute_type = compute_type or get_default_compute_type()
+    device = os.getenv("WHISPER_DEVICE", "cpu")
+    with _model_lock:
+        model = WHISPER_MODELS.get(compute_type)
+        if model is None:
+            size = get_model_size()
+            local_path = os.path.join("models", f"faster-whisper-{size}")
+            model_path = local_path if os.path.exists(local_path) else size
+            print(f"Loading Whisper Model from {model_path} ({device}, {compute_type})...")
+            try:
+                model = WhisperModel(model_path, device=device, compute_type=compute_type)
+            except Exception as e:
+                print(f"Error loading Whisper Model: {e}")
+                if model_path == size:
+                    raise
+                print(f"Fallback to {size} download...")
+                model = WhisperModel(size, device=device, compute_type=compute_type)
+            WHISPER_MODELS[compute_type] = model
+        return model
+
+
+def warm_up(compute_type: str = None) -> None:
+    """Load the model and run one second of silence through it so the first request is not slow."""
+    model = get_whisper_model(compute_type)
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+    list(segments)
+
+
+def unload_models() -> bool:
+    """Drop all loaded models. Returns True if anything was unloaded."""
+    with _model_lock:
+        if not WHISPER_MODELS:
+            return False
+        WHISPER_MODELS.clear()
+    gc.collect()
+    return True
+
+
+def get_asr_options(options: Dict[str, Any] = None) -> Dict[str, Any]:
+    return merge_options(DEFAULT_ASR_OPTIONS, options)
+
+
+def transcribe_audio(audio_path: str, language: str = None, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Transcribe an audio file.
+    Returns {"text", "segments": [{"start", "end", "text"}], "language", "duration"}.
+    """
+    options = get_asr_options(options)
+    model = get_whisper_model(options["compute_type"])
+
+    if options["mode"] == "batched":
+        # VAD splits the audio into speech chunks which are decoded batch_size at a time
+        pipeline = BatchedInferencePipeline(model=model)
+        segments, info = pipeline.transcribe(
+            audio_path,
+            language=language,
+            beam_size=options["beam_size"],
+            batch_size=options["batch_size"],
+            vad_filter=True,
+        )
+    else:
+        segments, info = model.transcribe(audio_path, beam_size=options["beam_size"], language=language)
+
+    out = []
+    for segment in segments:
+        out.append({
+            "start": round(segment.start, 2),
+            "end": round(segment.end, 2),
+            "text": segment.text,
+        })
+    return {
+        "text": "".join(s["text"] for s in out),
+        "segments": out,
+        "language": info.language,
+        "duration": info.duration,
+    }
@@ -0,0 +1,222 @@
+import fcntl
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+
+def get_socket_path() -> str:
+    return os.getenv("ASR_SERVICE_SOCKET", os.path.join("data", "asr.sock"))
+
+
+def get_authkey() -> bytes:
+    """
+    ASR_SERVICE_AUTHKEY, or the host's generated key: the connection pickles requests and responses,
+    so a key anyone could guess would let any local user run code in the service.
+    """
+    key = os.getenv("ASR_SERVICE_AUTHKEY")
+    if key:
+        return key.encode("utf-8")
+    key_path = get_socket_path() + ".key"
+    try:
+        with open(key_path, "rb") as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+    # Written in full before it appears under its name, and the first writer wins
+    os.makedirs(os.path.dirname(key_path) or ".", exist_ok=True)
+    tmp_path = f"{key_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(secrets.token_hex(32).encode("ascii"))
+    try:
+        os.link(tmp_path, key_path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    with open(key_path, "rb") as f:
+        return f.read().strip()
+
+
+def is_service_enabled() -> bool:
+    return os.getenv("ASR_SERVICE", "1") == "1"
+
+
+def is_preload_enabled() -> bool:
+    return os.getenv("WHISPER_PRELOAD", "0") == "1"
+
+
+class AsrServer:
+    """
+    Serves transcribe requests one at a time and unloads the model after WHISPER_IDLE_TIMEOUT seconds
+    without requests (0 keeps it loaded).
+    """
+
+    def __init__(self) -> None:
+        self.socket_path = get_socket_path()
+        self.idle_timeout = float(os.getenv("WHISPER_IDLE_TIMEOUT", "1800"))
+        self.last_used = time.monotonic()
+        self._infer_lock = threading.Lock()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        from utils.asr import transcribe_audio
+
+        if request.get("op") == "ping":
+            return {"ok": True}
+        # One inference at a time: the model already uses every core it is given
+        with self._infer_lock:
+            try:
+                result = transcribe_audio(request["path"], request.get("language"), request.get("options"))
+                return {"ok": True, "result": result}
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+            finally:
+                self.last_used = time.monotonic()
+
+    def serve_connection(self, conn) -> None:
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    return
+                conn.send(self.handle(request))
+        finally:
+            conn.close()
+
+    def idle_loop(self) -> None:
+        from utils.asr import unload_models
+
+        while True:
+            time.sleep(min(60.0, self.idle_timeout))
+            if time.monotonic() - self.last_used < self.idle_timeout:
+                continue
+            with self._infer_lock:
+                if unload_models():
+                    print("Whisper model unloaded after idle timeout")
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            try:
+                Client(self.socket_path, family="AF_UNIX", authkey=get_authkey()).close()
+                print(f"ASR service already running on {self.socket_path}")
+                return
+            except (OSError, EOFError):
+                # Stale socket left by a previous run
+                os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        # Listen before loading the model so clients can connect (and queue) while it loads
+        listener = Listener(self.socket_path, family="AF_UNIX", authkey=get_authkey())
+        print(f"ASR service listening on {self.socket_path}")
+
+        if is_preload_enabled():
+            from utils.asr import warm_up
+
+            with self._infer_lock:
+                warm_up()
+            self.last_used = time.monotonic()
+        if self.idle_timeout > 0:
+            threading.Thread(target=self.idle_loop, daemon=True).start()
+
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=self.serve_connection, args=(conn,), daemon=True).start()
+
+
+class AsrClient:
+    """
+    Talks to the shared ASR process (one per host, over a Unix socket, so the model is loaded once),
+    spawning it if nobody has yet. Run it directly with `python -m utils.asr_service`.
+    """
+
+    @property
+    def socket_path(self) -> str:
+        # Read on use: the module-level client is created before main.py loads .env
+        return get_socket_path()
+
+    def _connect(self):
+        return Client(self.socket_path, family="AF_UNIX", authkey=get_authkey())
+
+    def ensure_server(self) -> None:
+        try:
+            self._connect().close()
+            return
+        except (OSError, EOFError):
+            pass
+
+        # Only one worker spawns the service; the others wait on the lock and then find it running
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        with open(self.socket_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._connect().close()
+                return
+            except (OSError, EOFError):
+                pass
+            print("Starting shared ASR service...")
+            env = dict(os.environ, ASR_SERVICE_AUTHKEY=get_authkey().decode("utf-8"))
+            subprocess.Popen([sys.executable, "-m", "utils.asr_service"], start_new_session=True, env=env)
+            deadline = time.monotonic() + float(os.getenv("ASR_SERVICE_STARTUP_TIMEOUT", "60"))
+            while time.monotonic() < deadline:
+                time.sleep(0.2)
+                try:
+                    self._connect().close()
+                    return
+                except (OSError, EOFError):
+                    continue
+        raise RuntimeError("ASR service failed to start")
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self.ensure_server()
+        with self._connect() as conn:
+            conn.send(payload)
+            return conn.recv()
+
+    def transcribe(self, audio_path: str, language: str = None, options: Dict[str, Any] = None) -> Dict[str, Any]:
+        response = self.request({
+            "op": "transcribe",
+            "path": os.path.abspath(audio_path),
+            "language": language,
+            "options": options,
+        })
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error") or "ASR service error")
+        return response["result"]
+
+
+asr_client = AsrClient()
+
+
+def transcribe(audio_path: str, language: str = None, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Transcribe through the shared service, or in this process when ASR_SERVICE=0."""
+    if is_service_enabled():
+        return asr_client.transcribe(audio_path, language, options)
+    from utils.asr import transcribe_audio
+
+    return transcribe_audio(audio_path, language, options)
+
+
+def preload() -> None:
+    """Start (and warm) the model at startup when WHISPER_PRELOAD=1."""
+    if not is_preload_enabled():
+        return
+    if is_service_enabled():
+        asr_client.ensure_server()
+    else:
+        from utils.asr import warm_up
+
+        warm_up()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    AsrServer().serve_forever()
@@ -0,0 +1,83 @@
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class ConversionCache:
+    """
+    Persistent cache of process_file results.
+    Manifests live in static/convert/<md5>/manifest-<key>.json, next to the directory <key>/ holding that
+    conversion's artifacts, where key is derived from (md5, conversion parameters, converter version).
+    """
+
+    def __init__(self, root: str, version: str) -> None:
+        self.root = root
+        self.version = version
+
+    def key(self, md5: str, params: Dict[str, Any]) -> str:
+        raw = json.dumps({"md5": md5, "params": params, "version": self.version}, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _manifest_path(self, md5: str, key: str) -> str:
+        return os.path.join(self.root, md5, f"manifest-{key}.json")
+
+    def get(self, md5: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached manifest, or None if missing or its artifacts are gone."""
+        path = self._manifest_path(md5, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Artifacts may have been removed from disk; treat that as a miss.
+        # Deferred page images are rendered on first request, so they are not expected to exist yet.
+        ai = dict(manifest.get("ai") or {})
+        if ai.get("deferred"):
+            images = ai.pop("images", None) or []
+            # Their render settings must still be there to render them
+            if images and not os.path.exists(os.path.join(os.path.dirname(images[0].lstrip("/")), "render.json")):
+                return None
+        for url in _iter_static_urls(ai):
+            if not os.path.exists(url.lstrip("/")):
+                return None
+        return manifest
+
+    def put(self, md5: str, key: str, source: str, ai: Dict[str, Any]) -> None:
+        path = self._manifest_path(md5, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "ai": ai}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def lock(self, md5: str, name: str = ".lock") -> Iterator[None]:
+        """
+        Exclusive lock on static/convert/<md5>, or on a single artifact in it when name is given.
+        flock conflicts between separate open() calls, so this serializes
+        both threads of this process and other uvicorn workers.
+        """
+        lock_dir = os.path.join(self.root, md5)
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, name), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _iter_static_urls(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        if value.startswith("/static/"):
+            yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _iter_static_urls(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _iter_static_urls(v)
@@ -0,0 +1,103 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Break points in order of preference: paragraph, line, sentence (CJK and Latin), word
+BREAKS = ["\n\n", "\n", "。", "！", "？", ". ", "! ", "? ", "；", "; ", " "]
+
+
+def _find_break(text: str, start: int, end: int) -> int:
+    """Best place to end a chunk in text[start:end], searching only its second half."""
+    low = start + (end - start) // 2
+    for sep in BREAKS:
+        pos = text.rfind(sep, low, end)
+        if pos != -1:
+            return pos + len(sep)
+    return end
+
+
+def chunk_text(text: str, size: int = 1000, overlap: int = 100) -> List[Dict[str, Any]]:
+    """
+    Split text into chunks of at most size characters, preferring paragraph and sentence boundaries.
+    Consecutive chunks share up to overlap characters.
+    Returns [{"text", "start", "end"}] with character offsets into text.
+    """
+    return list(chunk_stream([text], size, overlap))
+
+
+def chunk_stream(blocks: Iterable[str], size: int = 1000, overlap: int = 100, encoding: Optional[str] = None, byte_offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    chunk_text for text that arrives in blocks; only about one block plus one chunk is held at a time.
+    With encoding, chunks also get byteStart/byteEnd into the encoded source, counted from byte_offset.
+    Byte offsets are exact unless undecodable bytes were replaced while decoding.
+    """
+    size = max(1, size)
+    overlap = max(0, min(overlap, size // 2))
+
+    def byte_length(part: str) -> int:
+        return len(part.encode(encoding, errors="replace")) if encoding else 0
+
+    blocks = iter(blocks)
+    buffer = ""
+    # Character offset of buffer[0]; start is relative to buffer, start_byte absolute
+    base = 0
+    start = 0
+    start_byte = byte_offset
+    done = False
+    while True:
+        while not done and len(buffer) - start <= size:
+            block = next(blocks, None)
+            if block is None:
+                done = True
+            else:
+                buffer += block
+        if start >= len(buffer):
+            break
+        end = min(start + size, len(buffer))
+        if end < len(buffer):
+            end = _find_break(buffer, start, end)
+        end_byte = start_byte + byte_length(buffer[start:end])
+        chunk = buffer[start:end]
+        if chunk.strip():
+            item = {"text": chunk.strip(), "start": base + start, "end": base + end}
+            if encoding:
+                item["byteStart"] = start_byte
+                item["byteEnd"] = end_byte
+            yield item
+        if end >= len(buffer):
+            break
+        next_start = max(end - overlap, start + 1)
+        start_byte = end_byte - byte_length(buffer[next_start:end])
+        start = next_start
+        # Drop the consumed prefix once it is the bigger part, so copying stays linear overall
+        if start > len(buffer) // 2:
+            buffer = buffer[start:]
+            base += start
+            start = 0
+
+
+def chunk_segments(segments: List[Dict[str, Any]], size: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Group consecutive transcript segments into chunks of about size characters.
+    Returns [{"text", "start", "end"}] with start/end in seconds.
+    """
+    chunks = []
+    current: List[Dict[str, Any]] = []
+    length = 0
+    for segment in segments:
+        text = segment["text"].strip()
+        if not text:
+            continue
+        if current and length + len(text) > size:
+            chunks.append(current)
+            current, length = [], 0
+        current.append(segment)
+        length += len(text)
+    if current:
+        chunks.append(current)
+    return [
+        {
+            "text": "".join(s["text"] for s in group).strip(),
+            "start": group[0]["start"],
+            "end": group[-1]["end"],
+        }
+        for group in chunks
+    ]
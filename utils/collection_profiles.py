@@ -0,0 +1,111 @@
+import os
+from typing import Any, Dict, Optional, Union
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+# Named collection layouts. Any field can be overridden per collection by passing a dict profile.
+COLLECTION_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Full float32 vectors and HNSW graph in RAM: best recall and latency, most memory
+    "default": {},
+    # int8 copy in RAM (4x smaller), originals on disk for rescoring
+    "scalar": {"quantization": "scalar", "on_disk": True},
+    # 1 bit per dimension in RAM (32x smaller), originals on disk; works best with high-dimensional embeddings
+    "binary": {"quantization": "binary", "on_disk": True, "oversampling": 2.0},
+    # Vectors and payloads memory-mapped from disk, no quantization
+    "disk": {"on_disk": True, "on_disk_payload": True},
+}
+
+PROFILE_FIELDS = {
+    # None, "scalar" or "binary"
+    "quantization": None,
+    # Keep quantized vectors in RAM even when the originals are on disk
+    "always_ram": True,
+    # Store original vectors on disk (memmap) instead of RAM
+    "on_disk": False,
+    "on_disk_payload": False,
+    # HNSW graph degree and build-time beam width; None keeps Qdrant's defaults (16 / 100)
+    "hnsw_m": None,
+    "hnsw_ef_construct": None,
+    # Search defaults for quantized collections: re-rank with the original vectors,
+    # fetching oversampling x limit candidates from the quantized index first
+    "rescore": True,
+    "oversampling": None,
+}
+
+
+def get_default_profile() -> str:
+    return os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+
+
+def resolve_profile(profile: Union[str, Dict[str, Any], None] = None) -> Dict[str, Any]:
+    """
+    A profile is a preset name, or a dict of PROFILE_FIELDS with an optional "base" preset.
+    Returns the complete field dict.
+    """
+    if profile is None:
+        profile = get_default_profile()
+    overrides: Dict[str, Any] = {}
+    if isinstance(profile, dict):
+        overrides = {k: v for k, v in profile.items() if k != "base"}
+        profile = profile.get("base", "default")
+    if profile not in COLLECTION_PROFILES:
+        raise ValueError(f"unknown collection profile '{profile}', expected one of {sorted(COLLECTION_PROFILES)}")
+    unknown = set(overrides) - set(PROFILE_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown collection profile fields: {sorted(unknown)}")
+
+    resolved = dict(PROFILE_FIELDS)
+    resolved.update(COLLECTION_PROFILES[profile])
+    resolved.update(overrides)
+    if resolved["quantization"] not in (None, "scalar", "binary"):
+        raise ValueError("quantization must be null, 'scalar' or 'binary'")
+    return resolved
+
+
+def collection_config(size: int, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments for create_collection implementing a resolved profile."""
+    config: Dict[str, Any] = {
+        "vectors_config": VectorParams(size=size, distance=Distance.COSINE, on_disk=profile["on_disk"] or None),
+    }
+    if profile["on_disk_payload"]:
+        config["on_disk_payload"] = True
+    if profile["hnsw_m"] is not None or profile["hnsw_ef_construct"] is not None:
+        config["hnsw_config"] = HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["hnsw_ef_construct"])
+    if profile["quantization"] == "scalar":
+        config["quantization_config"] = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=profile["always_ram"])
+        )
+    elif profile["quantization"] == "binary":
+        config["quantization_config"] = BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=profile["always_ram"])
+        )
+    return config
+
+
+def search_params(hnsw_ef: Optional[int] = None, oversampling: Optional[float] = None, rescore: Optional[bool] = None, profile: Optional[Dict[str, Any]] = None) -> Optional[SearchParams]:
+    """
+    Per-query search parameters. Values not given fall back to the collection's profile when it is known.
+    Returns None when nothing differs from Qdrant's defaults.
+    """
+    if profile and profile["quantization"]:
+        if oversampling is None:
+            oversampling = profile["oversampling"]
+        if rescore is None:
+            rescore = profile["rescore"]
+    quantization = None
+    if oversampling is not None or rescore is not None:
+        quantization = QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+    if hnsw_ef is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
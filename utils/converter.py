@@ -1,60 +1,71 @@
+import json
 import os
-import subprocess
-from typing import Any, Dict, List
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
 from bs4 import BeautifulSoup
-from pdf2image import convert_from_path
-from faster_whisper import WhisperModel
 
-CONVERT_DIR = "static/convert"
-WHISPER_MODEL = None
-WHISPER_MODEL_PATH = os.path.join("models", "faster-whisper-large-v3")
+from utils.asr_service import transcribe
+from utils.cache import ConversionCache
+from utils.excel import SheetSelectionError, convert_spreadsheet, get_excel_options
+from utils.office_pool import convert_office_document
+from utils.pdf_renderer import PDF_TEXT_MODES, get_page_texts, get_pdf_page_sizes, get_render_size, parse_page_range, render_pdf, render_pdf_pages
+from utils.storage import CONVERT_DIR, blob_store
+from utils.text_reader import extract_text
+from utils.video import align_transcript, extract_audio, extract_frames
 
+# Page render settings for documents processed with deferred rendering
+RENDER_CONFIG = "render.json"
+DEFERRED_PAGE_RE = re.compile(r"^convert/([0-9a-f]{32})/([0-9a-f]{16})/(\d+)\.jpg$")
+# Bump whenever converter output changes so cached manifests are not reused
+CONVERTER_VERSION = "11"
 
-def get_whisper_model():
-    global WHISPER_MODEL
-    if WHISPER_MODEL is None:
-        model_path = WHISPER_MODEL_PATH if os.path.exists(WHISPER_MODEL_PATH) else "large-v3"
-        print(f"Loading Whisper Model from {model_path}...")
-        try:
-            WHISPER_MODEL = WhisperModel(model_path, device="cpu", compute_type="int8")
-        except Exception as e:
-            print(f"Error loading Whisper Model: {e}")
-            # Fallback to base model if large fails? Or re-raise?
-            # Let's try downloading large-v3 if local path failed but we tried to use it?
-            # If model_path was the hardcoded path and it failed (unlikely if exists check passed),
-            # If it was "large-v3", it might fail due to network.
-            if model_path != "large-v3":
-                print("Fallback to large-v3 download...")
-                WHISPER_MODEL = WhisperModel("large-v3", device="cpu", compute_type="int8")
-    return WHISPER_MODEL
-
-
-def convert_audio_to_text(audio_path: str, language: str = None) -> str:
-    try:
-        model = get_whisper_model()
-        if not model:
-            return "Error: Whisper Model not loaded."
-
-        segments, info = model.transcribe(audio_path, beam_size=5, language=language)
 
-        full_text = []
-        for segment in segments:
-            # print("[%.2fs -> %.2fs] %s" % (segment.start, segment.end, segment.text))
-            full_text.append(segment.text)
-
-        return "".join(full_text)
+def convert_audio_to_text(audio_path: str, language: str = None, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Transcribe audio with Whisper.
+    Returns {"text", "segments"}; on failure text carries the error and segments is empty.
+    """
+    try:
+        transcript = transcribe(audio_path, language, options)
+        return {"text": transcript["text"], "segments": transcript["segments"]}
     except Exception as e:
         print(f"Error converting Audio to Text: {e}")
-        return f"Error: {str(e)}"
+        return {"text": f"Error: {str(e)}", "segments": []}
 
 
-def get_convert_dir(md5: str) -> str:
-    path = os.path.join(CONVERT_DIR, md5)
+def get_convert_dir(md5: str, cache_key: str) -> str:
+    """
+    Artifacts of one conversion live in static/convert/<md5>/<cache key>/, so conversions of the same file
+    with other options never overwrite the files an earlier manifest points to.
+    """
+    path = os.path.join(CONVERT_DIR, md5, cache_key)
     os.makedirs(path, exist_ok=True)
     return path
 
 
+def get_file_kind(filename: str, content_type: str) -> str:
+    """
+    Classify an upload by the converter that will handle it:
+    office, pdf, excel, video, audio, text or other.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in ['.doc', '.docx', '.ppt', '.pptx']:
+        return "office"
+    if ext == '.pdf':
+        return "pdf"
+    if ext in ['.xls', '.xlsx']:
+        return "excel"
+    if content_type.startswith('video/'):
+        return "video"
+    if content_type.startswith('audio/'):
+        return "audio"
+    if is_text_file(filename, content_type):
+        return "text"
+    return "other"
+
+
 def is_text_file(filename: str, content_type: str) -> bool:
     # Basic check for text extensions
     text_exts = ['.txt', '.md', '.html', '.css', '.js', '.py', '.json', '.xml', '.yml', '.yaml', '.log', '.csv']
@@ -69,86 +80,149 @@ def is_text_file(filename: str, content_type: str) -> bool:
 def convert_office_to_pdf(input_path: str, output_dir: str) -> str:
     """
     Convert office document to PDF using LibreOffice.
-    Returns the path to the generated PDF.
+    Returns the path to the generated PDF; raises if LibreOffice produced none.
     """
-    # soffice --headless --convert-to pdf --outdir <output_dir> <input_file>
-    # Note: On Docker/Linux, soffice should be in PATH
-    soffice_cmd = "soffice"
-
-    cmd = [
-        soffice_cmd,
-        "--headless",
-        "--convert-to",
-        "pdf",
-        "--outdir",
-        output_dir,
-        input_path
-    ]
+    pdf_path = convert_office_document(input_path, output_dir, "pdf")
 
-    try:
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        # The output filename will be same as input but with .pdf extension
-        base_name = os.path.splitext(os.path.basename(input_path))[0]
-        pdf_path = os.path.join(output_dir, base_name + ".pdf")
+    # Rename to result.pdf as per requirement
+    final_pdf_path = os.path.join(output_dir, "result.pdf")
+    if not pdf_path or not os.path.exists(pdf_path):
+        raise RuntimeError("Output file not found")
+    os.replace(pdf_path, final_pdf_path)
+    return final_pdf_path
 
-        # Rename to result.pdf as per requirement
-        final_pdf_path = os.path.join(output_dir, "result.pdf")
-        if os.path.exists(pdf_path):
-            if os.path.exists(final_pdf_path):
-                os.remove(final_pdf_path)
-            os.rename(pdf_path, final_pdf_path)
-            return final_pdf_path
-        return ""
+
+def load_page_texts(pdf_path: str, pages: List[int]) -> Optional[List[Dict[str, Any]]]:
+    try:
+        return get_page_texts(pdf_path, pages)
     except Exception as e:
-        print(f"Error converting to PDF: {e}")
-        return ""
+        print(f"Error extracting PDF text: {e}")
+        return None
 
 
-def convert_pdf_to_images(pdf_path: str, output_dir: str, max_width: int = None, max_height: int = None) -> List[str]:
+def convert_pdf_to_images(pdf_path: str, output_dir: str, max_width: int = None, max_height: int = None, pages: str = None, deferred: bool = False, on_page: Callable[[int, str], None] = None, text_layer: str = "on") -> Dict[str, Any]:
     """
-    Convert PDF to images using pdf2image.
-    Returns list of image URLs.
+    Convert PDF to images with pdftoppm, rendering each page straight at the size that fits max_width x max_height.
+    pages selects a subset like "1-3,5". With deferred, nothing is rendered here: the page URLs are returned
+    right away and each image is rendered on its first request (see render_deferred_page).
+    on_page(page, url) is called from the render threads as each page image is written.
+    text_layer "on" extracts each page's text with pdftotext while the pages render; "prefer" extracts it
+    first and only renders pages without a usable text layer; "off" skips it.
+    Returns {"pageCount": int, "images": [url, ...], "deferred": bool, "pageTexts": [{"page", "text", "chars", "scanned"}, ...], "error"}.
     """
+    result = {"pageCount": None, "images": [], "deferred": False, "pageTexts": None, "error": None}
+    if text_layer not in PDF_TEXT_MODES:
+        raise ValueError(f"Invalid PDF text mode: {text_layer}")
     try:
-        # On Docker/Linux, poppler tools (pdftoppm) are in /usr/bin or /usr/local/bin, which are in PATH.
-        # So we don't need to specify poppler_path explicitly if it's in PATH.
-        images = convert_from_path(pdf_path)
-        image_urls = []
-        for i, image in enumerate(images):
-            image_filename = f"{i+1}.jpg"
-            image_path = os.path.join(output_dir, image_filename)
-            image.save(image_path, "JPEG")
-
-            # Resize if dimensions provided
-            if max_width and max_height:
-                try:
-                    # Use ImageMagick to resize
-                    # Syntax: convert input.jpg -resize "WxH>" output.jpg
-                    # > means: only shrink if larger than dimensions
-                    resize_arg = f"{max_width}x{max_height}>"
-                    cmd = ["convert", image_path, "-resize", resize_arg, image_path]
-                    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                except Exception as e:
-                    print(f"Error resizing image {image_path}: {e}")
-
-            # Construct URL (assuming static mount at root)
-            image_urls.append(f"/{output_dir}/{image_filename}")
-        return image_urls
+        page_sizes = get_pdf_page_sizes(pdf_path)
     except Exception as e:
-        print(f"Error converting PDF to images: {e}")
-        return []
+        print(f"Error reading PDF info: {e}")
+        result["error"] = f"Error reading PDF info: {str(e)}"
+        return result
+    result["pageCount"] = len(page_sizes)
+    selected = parse_page_range(pages, len(page_sizes))
+
+    if text_layer == "prefer":
+        result["pageTexts"] = load_page_texts(pdf_path, selected)
+        if result["pageTexts"] is not None:
+            selected = [info["page"] for info in result["pageTexts"] if info["scanned"]]
+
+    # pdftotext is one cheap process, so it runs beside the render pool rather than taking one of its slots
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        texts = executor.submit(load_page_texts, pdf_path, selected) if text_layer == "on" else None
+        try:
+            if deferred:
+                config = {
+                    "pdf": pdf_path,
+                    "pageCount": len(page_sizes),
+                    "sizes": [get_render_size(size, max_width, max_height) for size in page_sizes],
+                }
+                config_path = os.path.join(output_dir, RENDER_CONFIG)
+                with open(config_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(config, f)
+                os.replace(config_path + ".tmp", config_path)
+                result["deferred"] = True
+                result["images"] = [f"/{output_dir}/{page}.jpg" for page in selected]
+            else:
+                def page_rendered(page: int, path: str) -> None:
+                    on_page(page, f"/{output_dir}/{os.path.basename(path)}")
+
+                paths = render_pdf(pdf_path, output_dir, max_width, max_height, pages=selected, on_page=page_rendered if on_page else None, page_sizes=page_sizes)
+                # Construct URL (assuming static mount at root)
+                result["images"] = [f"/{output_dir}/{os.path.basename(path)}" for path in paths]
+        except Exception as e:
+            print(f"Error converting PDF to images: {e}")
+            result["error"] = f"Error converting PDF to images: {str(e)}"
+        if texts is not None:
+            result["pageTexts"] = texts.result()
+    return result
 
 
-def read_text_content(file_path: str) -> str:
+def is_deferred_page(path: str) -> bool:
+    """
+    Whether path (relative to the static mount) names a page image of a deferred conversion whose
+    render settings are still on disk. Cheap enough to run on every 404 before queueing a render.
+    """
+    m = DEFERRED_PAGE_RE.match(path)
+    return bool(m) and os.path.exists(os.path.join(CONVERT_DIR, m.group(1), m.group(2), RENDER_CONFIG))
+
+
+def render_deferred_page(path: str) -> bool:
+    """
+    Render a deferred page image on first request.
+    path is relative to the static mount, e.g. convert/<md5>/<cache key>/3.jpg.
+    Returns True if the image exists afterwards.
+    """
+    m = DEFERRED_PAGE_RE.match(path)
+    if not m:
+        return False
+    md5, cache_key, page = m.group(1), m.group(2), int(m.group(3))
+    blob_store.touch(md5)
+    convert_dir = os.path.join(CONVERT_DIR, md5, cache_key)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except UnicodeDecodeError:
-        try:
-            with open(file_path, 'r', encoding='gbk') as f:
-                return f.read()
-        except:
-            return "Unable to decode text content."
+        with open(os.path.join(convert_dir, RENDER_CONFIG), "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if page < 1 or page > config["pageCount"]:
+        return False
+
+    image_path = os.path.join(convert_dir, f"{page}.jpg")
+    # Lock per page so different pages of one document render concurrently
+    with conversion_cache.lock(md5, f".lock-{cache_key}-{page}"):
+        if not os.path.exists(image_path):
+            render_pdf_pages(config["pdf"], convert_dir, page, page, tuple(config["sizes"][page - 1]))
+    return os.path.exists(image_path)
+
+
+def read_text(input_path: str, output_dir: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Text uploads through the streaming reader (see utils.text_reader); errors come back as text."""
+    try:
+        return extract_text(input_path, output_dir, options)
+    except (OSError, ValueError) as e:
+        return {"text": f"Error reading text content: {str(e)}"}
+
+
+def convert_excel(input_path: str, output_dir: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Convert a spreadsheet with the native streaming converter (see utils.excel).
+    Falls back to LibreOffice for HTML output when the workbook can't be read natively
+    (missing openpyxl/xlrd, encrypted or mislabeled files).
+    Returns {"text", "sheets"}.
+    """
+    try:
+        options = get_excel_options(options)
+    except ValueError as e:
+        return {"text": f"Error converting Excel file: {str(e)}", "sheets": None}
+    try:
+        return convert_spreadsheet(input_path, options)
+    except SheetSelectionError as e:
+        return {"text": f"Error converting Excel file: {str(e)}", "sheets": None}
+    except Exception as e:
+        print(f"Native Excel conversion failed, falling back to LibreOffice: {e}")
+    if options["mode"] != "html":
+        return {"text": "Error converting Excel file: only html output is available for this workbook", "sheets": None}
+    return {"text": convert_excel_to_html(input_path, output_dir), "sheets": None}
 
 
 def convert_excel_to_html(input_path: str, output_dir: str) -> str:
@@ -156,24 +230,8 @@ def convert_excel_to_html(input_path: str, output_dir: str) -> str:
     Convert Excel file to HTML using LibreOffice (soffice).
     Returns the HTML content string.
     """
-    # soffice --headless --convert-to html --outdir <output_dir> <input_file>
-    soffice_cmd = "soffice"
-
-    cmd = [
-        soffice_cmd,
-        "--headless",
-        "--convert-to",
-        "html",
-        "--outdir",
-        output_dir,
-        input_path
-    ]
-
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        # The output filename will be same as input but with .html extension
-        base_name = os.path.splitext(os.path.basename(input_path))[0]
-        html_path = os.path.join(output_dir, base_name + ".html")
+        html_path = convert_office_document(input_path, output_dir, "html")
 
         if os.path.exists(html_path):
             with open(html_path, 'r', encoding='utf-8') as f:
@@ -210,109 +268,191 @@ def convert_excel_to_html(input_path: str, output_dir: str) -> str:
         return f"Error converting Excel file: {str(e)}"
 
 
-def convert_video_to_images(video_path: str, output_dir: str, interval: float = 1.0, max_width: int = None, max_height: int = None) -> List[str]:
+def convert_video_to_images(video_path: str, output_dir: str, interval: float = 1.0, max_width: int = None, max_height: int = None, options: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     """
     Convert Video to images using ffmpeg.
-    Returns list of image URLs.
+    Returns list of frames as {"url", "time"}; raises if extraction fails.
     """
+    frames = extract_frames(video_path, output_dir, interval, max_width, max_height, options)
+    return [{"url": f"/{output_dir}/{os.path.basename(f['path'])}", "time": f["time"]} for f in frames]
+
+
+def transcribe_video(video_path: str, output_dir: str, language: str = None, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Extract the audio track of a video and transcribe it. Returns {"text", "segments"}."""
+    try:
+        audio_path = extract_audio(video_path, output_dir)
+    except Exception as e:
+        print(f"Error extracting audio from Video: {e}")
+        return {"text": f"Error: {str(e)}", "segments": []}
+    if not audio_path:
+        return {"text": None, "segments": []}
     try:
-        # ffmpeg -i input.mp4 -vf "fps=1/interval,scale=w:h" output_%03d.jpg
+        return convert_audio_to_text(audio_path, language, options)
+    finally:
+        os.remove(audio_path)
 
-        vf_filters = []
-        if interval > 0:
-            vf_filters.append(f"fps=1/{interval}")
 
-        if max_width and max_height:
-            # Scale while keeping aspect ratio, fit within box
-            # force_original_aspect_ratio=decrease ensures it fits inside the box
-            vf_filters.append(f"scale='min({max_width},iw)':'min({max_height},ih)':force_original_aspect_ratio=decrease")
+def convert_video(video_path: str, output_dir: str, enbaleV2I: bool = True, interval: float = 1.0, max_width: int = None, max_height: int = None, video_options: Dict[str, Any] = None, enableA2T: bool = True, language: str = None, asr_options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Frame extraction and audio transcription run concurrently, so latency is close to the slower of the two.
+    Each stream is decoded once: the frame pass decodes video, the audio pass (-vn) decodes only audio.
+    Frames get the text spoken while they were on screen.
+    """
+    result = {"images": [], "frames": None, "text": None, "segments": None, "error": None}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        frames_future = executor.submit(convert_video_to_images, video_path, output_dir, interval, max_width, max_height, video_options) if enbaleV2I else None
+        transcript_future = executor.submit(transcribe_video, video_path, output_dir, language, asr_options) if enableA2T else None
 
-        vf_arg = ",".join(vf_filters)
+        if frames_future:
+            try:
+                result["frames"] = frames_future.result()
+            except Exception as e:
+                print(f"Error converting Video to images: {e}")
+                result["frames"] = []
+                result["error"] = f"Error converting Video to images: {str(e)}"
+            result["images"] = [frame["url"] for frame in result["frames"]]
+        if transcript_future:
+            result.update(transcript_future.result())
+
+    if result["frames"] and result["segments"]:
+        align_transcript(result["frames"], result["segments"])
+    return result
 
-        output_pattern = os.path.join(output_dir, "frame_%03d.jpg")
 
-        # Clean up existing frames in output_dir if any?
-        # Actually output_dir is per file (md5), so it should be fine.
+conversion_cache = ConversionCache(CONVERT_DIR, CONVERTER_VERSION)
 
-        cmd = [
-            "ffmpeg",
-            "-i", video_path,
-            "-vf", vf_arg,
-            "-q:v", "2",  # High quality
-            output_pattern
-        ]
 
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+def is_error_text(text: Any) -> bool:
+    """Converters swallow errors and return a message as the text; this recognizes those messages."""
+    return isinstance(text, str) and text.startswith(("Error", "Conversion failed", "Unable to decode"))
 
-        # Collect generated images
-        image_urls = []
-        # Sort files to ensure order
-        files = sorted([f for f in os.listdir(output_dir) if f.startswith("frame_") and f.endswith(".jpg")])
-        for f in files:
-            image_urls.append(f"/{output_dir}/{f}")
 
-        return image_urls
-    except Exception as e:
-        print(f"Error converting Video to images: {e}")
-        return []
+def is_cacheable(result: Dict[str, Any]) -> bool:
+    """Converters swallow errors, so don't cache results that look like a failed conversion."""
+    if result.get("error"):
+        return False
+    if result["pdf"] and not result["pageCount"]:
+        return False
+    # Frames were asked for and none came back
+    if result["video"] and result["frames"] is not None and not result["frames"]:
+        return False
+    return not is_error_text(result["text"])
 
 
-def process_file(file_info: Dict[str, Any], image_width: int = None, image_height: int = None, enbaleV2I: bool = True, videoFPS: float = 1.0, enableA2T: bool = True, audioLanguage: str = None) -> Dict[str, Any]:
+def process_file(file_info: Dict[str, Any], image_width: int = None, image_height: int = None, enbaleV2I: bool = True, videoFPS: float = 1.0, enableA2T: bool = True, audioLanguage: str = None, pages: str = None, deferred: bool = False, asr_options: Dict[str, Any] = None, video_options: Dict[str, Any] = None, excel_options: Dict[str, Any] = None, pdf_text: str = "on", text_options: Dict[str, Any] = None, on_page: Callable[[int, str], None] = None) -> Dict[str, Any]:
+    """
+    Convert an uploaded file, reusing a cached result for the same bytes and options.
+    Concurrent conversions of the same md5 are serialized so only one of them does the work.
+    on_page(page, url) reports PDF page images as they are rendered; it is not called for cached results.
+    """
+    md5 = file_info['md5']
+    blob_store.touch(md5)
+    params = {
+        "ext": os.path.splitext(file_info['name'])[1].lower(),
+        "contentType": file_info['contentType'],
+        "imgW": image_width,
+        "imgH": image_height,
+        "enbaleV2I": enbaleV2I,
+        "videoFPS": videoFPS,
+        "enableA2T": enableA2T,
+        "audioLanguage": audioLanguage,
+        "pages": pages,
+        "deferred": deferred,
+        "asr": asr_options,
+        "video": video_options,
+        "excel": excel_options,
+        "pdfText": pdf_text,
+        "text": text_options,
+    }
+    key = conversion_cache.key(md5, params)
+
+    manifest = conversion_cache.get(md5, key)
+    if manifest is None:
+        with conversion_cache.lock(md5):
+            # Another request may have finished the same conversion while we waited
+            manifest = conversion_cache.get(md5, key)
+            if manifest is None:
+                result = convert_file(file_info, image_width, image_height, enbaleV2I, videoFPS, enableA2T, audioLanguage, pages, deferred, asr_options, video_options, excel_options, pdf_text, text_options, on_page, key)
+                if is_cacheable(result):
+                    conversion_cache.put(md5, key, file_info['url'], result)
+                return result
+
+    # Fields pointing at the original upload are rebound to this upload's URL
+    result = manifest["ai"]
+    for field in ("pdf", "video", "audio"):
+        if result.get(field) == manifest.get("source"):
+            result[field] = file_info['url']
+    return result
+
+
+def convert_file(file_info: Dict[str, Any], image_width: int = None, image_height: int = None, enbaleV2I: bool = True, videoFPS: float = 1.0, enableA2T: bool = True, audioLanguage: str = None, pages: str = None, deferred: bool = False, asr_options: Dict[str, Any] = None, video_options: Dict[str, Any] = None, excel_options: Dict[str, Any] = None, pdf_text: str = "on", text_options: Dict[str, Any] = None, on_page: Callable[[int, str], None] = None, cache_key: str = "default") -> Dict[str, Any]:
     file_path = file_info['path']
     filename = file_info['name']
     md5 = file_info['md5']
     content_type = file_info['contentType']
 
-    convert_dir = get_convert_dir(md5)
+    convert_dir = get_convert_dir(md5, cache_key)
 
     result = {
         "text": None,
         "images": [],
         "pdf": None,
         "video": None,
-        "audio": None
+        "audio": None,
+        "pageCount": None,
+        "deferred": False,
+        "segments": None,
+        "frames": None,
+        "sheets": None,
+        "pageTexts": None,
+        "textChunks": None,
+        "textUrl": None,
+        "encoding": None,
+        "textTruncated": False,
+        # Set when a conversion step failed, so the result is neither cached nor mistaken for an empty document
+        "error": None,
     }
 
-    ext = os.path.splitext(filename)[1].lower()
+    kind = get_file_kind(filename, content_type)
 
     # 1. Doc/Docx/PPT/PPTX
-    if ext in ['.doc', '.docx', '.ppt', '.pptx']:
-        pdf_path = convert_office_to_pdf(file_path, convert_dir)
-        if pdf_path and os.path.exists(pdf_path):
-            result["pdf"] = f"/{convert_dir}/result.pdf"
+    if kind == "office":
+        # The PDF doesn't depend on any option, so every conversion of this file shares it
+        source_dir = os.path.dirname(convert_dir)
+        pdf_path = os.path.join(source_dir, "result.pdf")
+        if not os.path.exists(pdf_path):
+            try:
+                convert_office_to_pdf(file_path, source_dir)
+            except Exception as e:
+                print(f"Error converting to PDF: {e}")
+                result["error"] = f"Error converting to PDF: {str(e)}"
+        if os.path.exists(pdf_path):
+            result["pdf"] = f"/{source_dir}/result.pdf"
             # Convert PDF to images
-            result["images"] = convert_pdf_to_images(pdf_path, convert_dir, image_width, image_height)
+            result.update(convert_pdf_to_images(pdf_path, convert_dir, image_width, image_height, pages, deferred, on_page, pdf_text))
 
     # 2. PDF
-    elif ext == '.pdf':
+    elif kind == "pdf":
         # Use original upload path, no need to copy
         result["pdf"] = file_info['url']
-        result["images"] = convert_pdf_to_images(file_path, convert_dir, image_width, image_height)
+        result.update(convert_pdf_to_images(file_path, convert_dir, image_width, image_height, pages, deferred, on_page, pdf_text))
 
     # 3. Excel
-    elif ext in ['.xls', '.xlsx']:
-        result["text"] = convert_excel_to_html(file_path, convert_dir)
+    elif kind == "excel":
+        result.update(convert_excel(file_path, convert_dir, excel_options))
 
     # 4. Video/Audio
-    elif content_type.startswith('video/'):
+    elif kind == "video":
         result["video"] = file_info['url']
-        if enbaleV2I:
-            result["images"] = convert_video_to_images(file_path, convert_dir, videoFPS, image_width, image_height)
-
-        # Video to Text? (Not requested, but useful. User asked "Audio files processing", but video also has audio)
-        # Requirement: "Increase processing for uploaded audio files... convert audio file to Text"
-        # I'll stick to audio files for now unless video/ also needs it.
-        # But usually user might want audio from video too.
-        # However, strictly speaking, type is 'audio/'.
-        # I'll leave video alone for A2T unless I extract audio.
+        result.update(convert_video(file_path, convert_dir, enbaleV2I, videoFPS, image_width, image_height, video_options, enableA2T, audioLanguage, asr_options))
 
-    elif content_type.startswith('audio/'):
+    elif kind == "audio":
         result["audio"] = file_info['url']
         if enableA2T:
-            result["text"] = convert_audio_to_text(file_path, audioLanguage)
+            result.update(convert_audio_to_text(file_path, audioLanguage, asr_options))
 
     # 5. Text/Code
-    elif is_text_file(filename, content_type):
-        result["text"] = read_text_content(file_path)
+    elif kind == "text":
+        result.update(read_text(file_path, convert_dir, text_options))
 
     return result
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.single_flight import SingleFlight
+
+EMBEDDING_CACHE_PATH = os.path.join("data", "embeddings.db")
+
+
+def normalize_items(items: Any) -> Any:
+    """Canonical form of embedding inputs: surrounding whitespace in text doesn't change the key."""
+    if isinstance(items, dict):
+        return {k: normalize_items(v) for k, v in items.items()}
+    if isinstance(items, list):
+        return [normalize_items(v) for v in items]
+    if isinstance(items, str):
+        return items.strip()
+    return items
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: a bounded in-process LRU in front of a SQLite table
+    holding vectors as float32 blobs. Identical requests in flight at the same time
+    share one upstream call.
+    """
+
+    def __init__(self) -> None:
+        self.memory_items = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "4096"))
+        self.disk_items = int(os.getenv("EMBEDDING_CACHE_DISK_ITEMS", "200000"))
+        self.ttl = float(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 3600)))
+        db_path = os.getenv("EMBEDDING_CACHE_PATH", EMBEDDING_CACHE_PATH)
+
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.flight = SingleFlight()
+        self.counters = {"memoryHits": 0, "diskHits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        self.db: Optional[sqlite3.Connection] = None
+        if db_path and self.disk_items > 0:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed_at)")
+            self.db.commit()
+
+    def key(self, model: str, instructions: str, items: List[Dict[str, Any]]) -> str:
+        raw = json.dumps([model, instructions, normalize_items(items)], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        entry = self.memory.get(key)
+        if entry is None:
+            return None
+        vector, created_at = entry
+        if self._expired(created_at):
+            del self.memory[key]
+            return None
+        self.memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key: str, vector: List[float], created_at: float) -> None:
+        self.memory[key] = (vector, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self.db.execute("SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1]):
+                self.db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self.db.commit()
+                return None
+            self.db.execute("UPDATE embeddings SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+        vector = array("f")
+        vector.frombytes(row[0])
+        return vector.tolist(), row[1]
+
+    def _disk_put(self, key: str, vector: List[float], created_at: float) -> None:
+        blob = array("f", vector).tobytes()
+        with self._db_lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, created_at, created_at),
+            )
+            self._writes += 1
+            # Evict in batches rather than on every write
+            if self._writes % 256 == 0:
+                self._disk_evict()
+            self.db.commit()
+
+    def _disk_evict(self) -> None:
+        if self.ttl > 0:
+            cur = self.db.execute("DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl,))
+            self.counters["evictions"] += cur.rowcount
+        count = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self.disk_items:
+            cur = self.db.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+                (count - self.disk_items,),
+            )
+            self.counters["evictions"] += cur.rowcount
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[List[float]]]) -> List[float]:
+        vector = self._memory_get(key)
+        if vector is not None:
+            self.counters["memoryHits"] += 1
+            return vector
+
+        # Identical requests fetching at the same time share one disk lookup and upstream call
+        vector, shared = await self.flight.do(key, lambda: self._load_or_compute(key, compute))
+        if shared:
+            self.counters["coalesced"] += 1
+        return vector
+
+    async def _load_or_compute(self, key: str, compute: Callable[[], Awaitable[List[float]]]) -> List[float]:
+        hit = await asyncio.to_thread(self._disk_get, key) if self.db else None
+        if hit is not None:
+            self.counters["diskHits"] += 1
+            vector, created_at = hit
+            self._memory_put(key, vector, created_at)
+            return vector
+        self.counters["misses"] += 1
+        vector = await compute()
+        created_at = time.time()
+        self._memory_put(key, vector, created_at)
+        if self.db:
+            await asyncio.to_thread(self._disk_put, key, vector, created_at)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["memoryHits"] + self.counters["diskHits"] + self.counters["misses"]
+        hits = self.counters["memoryHits"] + self.counters["diskHits"]
+        return {
+            **self.counters,
+            "hitRatio": round(hits / lookups, 4) if lookups else None,
+            "memoryItems": len(self.memory),
+            "memoryCapacity": self.memory_items,
+        }
@@ -0,0 +1,370 @@
+import bisect
+import csv
+import io
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, time
+from html import escape
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.options import merge_options
+
+DEFAULT_EXCEL_OPTIONS = {
+    # html: table markup with rowspan/colspan; csv / markdown: compact text, merged areas left empty
+    "mode": "html",
+    # Comma-separated sheet names or 1-based indexes; None converts every sheet
+    "sheets": None,
+    # Caps per sheet (0 means no limit)
+    "max_rows": 0,
+    "max_cols": 0,
+    # True: each sheet's output in sheets[*].text and no joined text; False: joined text only
+    "split": False,
+}
+
+EXCEL_MODES = ("html", "csv", "markdown")
+
+_MERGE_CELL_RE = re.compile(rb'<(?:\w+:)?mergeCell\b[^>]*?\bref="([A-Za-z]+\d+):([A-Za-z]+\d+)"')
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+class SheetSelectionError(ValueError):
+    """Raised when a requested sheet doesn't exist in the workbook."""
+
+
+def get_excel_options(options: Dict[str, Any] = None) -> Dict[str, Any]:
+    return merge_options(DEFAULT_EXCEL_OPTIONS, options, EXCEL_MODES)
+
+
+class MergeMap:
+    """
+    Merged ranges of one sheet, 0-based and inclusive (first_row, last_row, first_col, last_col).
+    Only the ranges overlapping the current row are kept at hand, sorted by first column, so a lookup
+    is a binary search however large the merged areas are. Rows are expected in increasing order.
+    """
+
+    def __init__(self, ranges: List[Tuple[int, int, int, int]] = ()) -> None:
+        self.ranges = sorted(ranges)
+        self._next = 0
+        self._row = -1
+        self._active: List[Tuple[int, int, int, int]] = []
+        self._starts: List[int] = []
+
+    def _at(self, row: int) -> None:
+        if row == self._row:
+            return
+        if row < self._row:
+            self._next, self._active = 0, []
+        active = [r for r in self._active if r[1] >= row]
+        while self._next < len(self.ranges) and self.ranges[self._next][0] <= row:
+            if self.ranges[self._next][1] >= row:
+                active.append(self.ranges[self._next])
+            self._next += 1
+        active.sort(key=lambda r: r[2])
+        self._active = active
+        self._starts = [r[2] for r in active]
+        self._row = row
+
+    def _find(self, row: int, col: int) -> Optional[Tuple[int, int, int, int]]:
+        self._at(row)
+        i = bisect.bisect_right(self._starts, col) - 1
+        if i >= 0 and self._active[i][3] >= col:
+            return self._active[i]
+        return None
+
+    def covers(self, row: int, col: int) -> bool:
+        return self._find(row, col) is not None
+
+    def span(self, row: int, col: int) -> Any:
+        """(rowspan, colspan) at the first cell of a merge, None for the other cells in it, False outside merges."""
+        merge = self._find(row, col)
+        if merge is None:
+            return False
+        r1, r2, c1, c2 = merge
+        if (row, col) != (r1, c1):
+            return None
+        return r2 - r1 + 1, c2 - c1 + 1
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def _parse_cell_ref(ref: str) -> Tuple[int, int]:
+    letters = ref.rstrip("0123456789")
+    return int(ref[len(letters):]) - 1, _column_index(letters.upper())
+
+
+def _xlsx_sheet_parts(path: str) -> Dict[str, str]:
+    """Sheet name -> zip member holding its XML, from the workbook part and its relationships."""
+    with zipfile.ZipFile(path) as archive:
+        workbook = "xl/workbook.xml"
+        for rel in ET.fromstring(archive.read("_rels/.rels")).iter(f"{_PKG_REL_NS}Relationship"):
+            if rel.get("Type", "").endswith("/officeDocument"):
+                workbook = rel.get("Target").lstrip("/")
+        base = posixpath.dirname(workbook)
+        rels_path = posixpath.join(base, "_rels", posixpath.basename(workbook) + ".rels")
+        targets = {
+            rel.get("Id"): rel.get("Target")
+            for rel in ET.fromstring(archive.read(rels_path)).iter(f"{_PKG_REL_NS}Relationship")
+        }
+        parts = {}
+        for sheet in ET.fromstring(archive.read(workbook)).iter(f"{_MAIN_NS}sheet"):
+            target = targets.get(sheet.get(f"{_REL_NS}id"))
+            if target:
+                # Targets are relative to the workbook part unless absolute
+                parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        return parts
+
+
+def _xlsx_merges(path: str, part: Optional[str], chunk_size: int = 1 << 20) -> List[Tuple[int, int, int, int]]:
+    """
+    Merged ranges of one sheet of an xlsx file, part being its zip member.
+    A regex over the raw XML in chunks is much cheaper than parsing the sheet a second time.
+    """
+    ranges = []
+    if not part:
+        return ranges
+    tail = b""
+    with zipfile.ZipFile(path) as archive, archive.open(part) as source:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            data = tail + chunk
+            end = 0
+            for m in _MERGE_CELL_RE.finditer(data):
+                (r1, c1), (r2, c2) = _parse_cell_ref(m.group(1).decode()), _parse_cell_ref(m.group(2).decode())
+                ranges.append((r1, r2, c1, c2))
+                end = m.end()
+            # Keep enough of the end to catch a tag split across chunks
+            tail = data[max(end, len(data) - 256):]
+    return ranges
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == time() else value.isoformat(sep=" ")
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _iter_xlsx(path: str, select: Callable[[List[str]], List[int]]) -> Iterator[Tuple[str, Any, Any]]:
+    """Yield (sheet name, row iterator, merge ranges loader) for the sheets select(names) picks."""
+    from openpyxl import load_workbook
+
+    # One load only: for sheets without a <dimension> openpyxl parses the whole sheet while loading
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        selected = set(select(workbook.sheetnames))
+        try:
+            parts = _xlsx_sheet_parts(path)
+        except (KeyError, ET.ParseError, zipfile.BadZipFile):
+            # Merges are lost, the cell data is still readable
+            parts = {}
+        for index, ws in enumerate(workbook.worksheets):
+            if index not in selected:
+                continue
+            # Some writers store a wrong <dimension>, which would cut rows short; trailing empty cells are trimmed anyway
+            ws.reset_dimensions()
+            rows = (tuple(format_value(v) for v in row) for row in ws.iter_rows(values_only=True))
+            yield ws.title, rows, lambda part=parts.get(ws.title): _xlsx_merges(path, part)
+    finally:
+        workbook.close()
+
+
+def _iter_xls(path: str, select: Callable[[List[str]], List[int]]) -> Iterator[Tuple[str, Any, Any]]:
+    import xlrd
+
+    # formatting_info is what makes xlrd report merged cells
+    book = xlrd.open_workbook(path, formatting_info=True, on_demand=True)
+    try:
+        selected = set(select(book.sheet_names()))
+        for index in range(book.nsheets):
+            if index not in selected:
+                continue
+            sheet = book.sheet_by_index(index)
+
+            def rows(sheet=sheet):
+                for r in range(sheet.nrows):
+                    values = []
+                    for cell in sheet.row(r):
+                        if cell.ctype == xlrd.XL_CELL_DATE:
+                            values.append(format_value(xlrd.xldate.xldate_as_datetime(cell.value, book.datemode)))
+                        elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                            values.append(format_value(bool(cell.value)))
+                        elif cell.ctype == xlrd.XL_CELL_ERROR:
+                            values.append(xlrd.error_text_from_code.get(cell.value, ""))
+                        else:
+                            values.append(format_value(cell.value))
+                    yield tuple(values)
+
+            # xlrd ranges are half-open: (rlo, rhi, clo, chi)
+            merges = [(r1, r2 - 1, c1, c2 - 1) for r1, r2, c1, c2 in sheet.merged_cells]
+            yield sheet.name, rows(), lambda merges=merges: merges
+            book.unload_sheet(index)
+    finally:
+        book.release_resources()
+
+
+def _select(names: List[str], spec: Optional[str]) -> List[int]:
+    if not spec:
+        return list(range(len(names)))
+    selected = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part in names:
+            selected.append(names.index(part))
+        elif part.isdigit() and 1 <= int(part) <= len(names):
+            selected.append(int(part) - 1)
+        else:
+            raise SheetSelectionError(f"Sheet not found: {part}")
+    return selected
+
+
+class SheetWriter:
+    """Writes one sheet in the requested mode to out (a buffer of its own by default). Rows arrive one at a time."""
+
+    def __init__(self, name: str, mode: str, merges: MergeMap, max_cols: int, out: Optional[io.StringIO] = None) -> None:
+        self.name = name
+        self.mode = mode
+        self.merges = merges
+        self.max_cols = max_cols
+        self.out = out if out is not None else io.StringIO()
+        self.rows = 0
+        self.cols = 0
+        self._blank_rows = 0
+        self.truncated = False
+        self._csv = csv.writer(self.out, lineterminator="\n") if mode == "csv" else None
+        if mode == "html":
+            self.out.write("<table>")
+
+    def _cap(self, index: int, values: Tuple[str, ...]) -> Tuple[str, ...]:
+        # Trailing empty cells carry no content, unless they are part of a merged area
+        end = len(values)
+        while end and values[end - 1] == "" and not self.merges.covers(index, end - 1):
+            end -= 1
+        if self.max_cols and end > self.max_cols:
+            end = self.max_cols
+            self.truncated = True
+        return values[:end]
+
+    def _write_html(self, index: int, values: Tuple[str, ...]) -> None:
+        cells = []
+        for col, value in enumerate(values):
+            span = self.merges.span(index, col)
+            if span is None:
+                # Covered by a merge anchored elsewhere
+                continue
+            attrs = ""
+            if span:
+                rowspan, colspan = span
+                if self.max_cols:
+                    colspan = min(colspan, self.max_cols - col)
+                if rowspan > 1:
+                    attrs += f' rowspan="{rowspan}"'
+                if colspan > 1:
+                    attrs += f' colspan="{colspan}"'
+            cells.append(f"<td{attrs}>{escape(value)}</td>")
+        self.out.write("<tr>" + "".join(cells) + "</tr>")
+
+    def _write_markdown(self, values: Tuple[str, ...]) -> None:
+        cells = [v.replace("|", "\\|").replace("\n", " ") for v in values]
+        self.out.write("| " + " | ".join(cells) + " |\n")
+        if self.rows == 0:
+            self.out.write("|" + "---|" * max(1, len(cells)) + "\n")
+
+    def _write(self, index: int, values: Tuple[str, ...]) -> None:
+        if self.mode == "html":
+            self._write_html(index, values)
+        elif self.mode == "csv":
+            self._csv.writerow(values)
+        else:
+            self._write_markdown(values)
+        self.cols = max(self.cols, len(values))
+
+    def add(self, values: Tuple[str, ...]) -> None:
+        index = self.rows + self._blank_rows
+        values = self._cap(index, values)
+        if not values:
+            # Held back so trailing blank rows are dropped, written if content follows
+            self._blank_rows += 1
+            return
+        for blank in range(self._blank_rows):
+            self._write(self.rows + blank, ())
+        self.rows += self._blank_rows
+        self._blank_rows = 0
+        self._write(index, values)
+        self.rows += 1
+
+    def finish(self) -> None:
+        if self.mode == "html":
+            self.out.write("</table>")
+
+
+def convert_spreadsheet(path: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Convert an xlsx or xls workbook.
+    Returns {"text", "sheets": [{"name", "rows", "cols", "truncated"}]}. text joins the sheets under a heading each;
+    with the split option text is None and every sheet has its own "text" instead.
+    """
+    options = get_excel_options(options)
+    mode = options["mode"]
+    split = bool(options["split"])
+    max_rows = int(options["max_rows"] or 0)
+    max_cols = int(options["max_cols"] or 0)
+    reader = _iter_xls if os.path.splitext(path)[1].lower() == ".xls" else _iter_xlsx
+
+    selected: List[int] = []
+
+    def select(names: List[str]) -> List[int]:
+        selected.extend(_select(names, options["sheets"]))
+        return selected
+
+    # Joined output is written straight into one buffer, so no sheet is held twice
+    out = None if split else io.StringIO()
+    sheets = []
+    # The selection is checked against the sheet names before any sheet is read
+    for name, rows, load_merges in reader(path, select):
+        if out is not None:
+            if mode != "html" and sheets:
+                out.write("\n")
+            if mode == "html":
+                out.write(f"<h1>{escape(name)}</h1>")
+            elif mode == "markdown":
+                out.write(f"## {name}\n\n")
+            elif len(set(selected)) > 1:
+                # A single csv sheet stays plain csv
+                out.write(f"# {name}\n")
+        merges = MergeMap(load_merges() if mode == "html" else [])
+        writer = SheetWriter(name, mode, merges, max_cols, out)
+        truncated = False
+        for row_index, values in enumerate(rows):
+            if max_rows and row_index >= max_rows:
+                truncated = True
+                break
+            writer.add(values)
+        writer.finish()
+        sheet = {"name": name, "rows": writer.rows, "cols": writer.cols, "truncated": truncated or writer.truncated}
+        if split:
+            sheet["text"] = writer.out.getvalue()
+        sheets.append(sheet)
+    return {"text": out.getvalue() if out is not None else None, "sheets": sheets}
+
@@ -1,10 +1,18 @@
+import asyncio
 import hashlib
 import os
-from datetime import datetime
+import tempfile
 
+import aiofiles
 from fastapi import UploadFile
+from fastapi.responses import JSONResponse
 
-UPLOAD_DIR = "static/upload"
+from utils.storage import BLOB_DIR, blob_store
+
+CHUNK_SIZE = 1024 * 1024
+
+# Room for the other form fields and multipart boundaries on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
 
 def get_file_md5(file_path: str) -> str:
     """Calculate MD5 of a file."""
@@ -18,47 +26,123 @@ def get_content_md5(content: bytes) -> str:
     """Calculate MD5 of bytes content."""
     return hashlib.md5(content).hexdigest()
 
+def safe_filename(filename: str, fallback: str) -> str:
+    """The last path component of an uploaded name; fallback when that names no file ("", "." or "..")."""
+    name = os.path.basename(filename or "").strip()
+    return fallback if name in ("", ".", "..") else name
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_SIZE."""
+
+
+def get_max_upload_size() -> int:
+    """Maximum upload size in bytes from MAX_UPLOAD_SIZE, 0 means unlimited."""
+    return int(os.getenv("MAX_UPLOAD_SIZE", "0"))
+
+
+def upload_too_large_response(max_size: int) -> JSONResponse:
+    """The one response for uploads over MAX_UPLOAD_SIZE, whether the middleware or save_upload_file catches them."""
+    return JSONResponse(status_code=413, content={"code": 413, "message": f"File exceeds maximum upload size of {max_size} bytes", "data": None})
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects multipart requests over MAX_UPLOAD_SIZE before python-multipart spools them to disk:
+    up front from Content-Length, or, for bodies sent without one, as soon as the bytes received pass the limit.
+    The limit allows MULTIPART_OVERHEAD for the rest of the form; save_upload_file still checks the exact file size.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        max_size = get_max_upload_size()
+        if scope["type"] != "http" or not max_size:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").lower().startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_size + MULTIPART_OVERHEAD
+        reject = upload_too_large_response(max_size)
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            await reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                raise UploadTooLargeError(f"File exceeds maximum upload size of {max_size} bytes")
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Failing the read makes the form parser give up without writing the rest
+                    exceeded = True
+                    raise UploadTooLargeError(f"File exceeds maximum upload size of {max_size} bytes")
+            return message
+
+        async def limited_send(message) -> None:
+            nonlocal started, rejected
+            # Whatever error response the app made of the failed read is replaced with the 413
+            if exceeded and not started:
+                if not rejected:
+                    rejected = True
+                    await reject(scope, receive, send)
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, limited_send)
+
+
 async def save_upload_file(file: UploadFile) -> dict:
     """
-    Save uploaded file to static/upload/YYYY-MM-DD/
+    Save uploaded file to static/upload/<md5>/<name>, a hard link to its content-addressed blob (see utils.storage).
+    The upload is streamed to a temp file in fixed-size chunks while the MD5 is updated,
+    so memory stays flat regardless of file size.
     Returns a dict with file info.
     """
-    # Create directory based on current date
-    now = datetime.now()
-    date_path = now.strftime("%Y-%m-%d")
-    save_dir = os.path.join(UPLOAD_DIR, date_path)
-    os.makedirs(save_dir, exist_ok=True)
-
-    # Read content to calculate MD5 and save
-    content = await file.read()
-    md5 = get_content_md5(content)
-    
-    # Reset cursor for saving (though we have content in memory, we can write bytes directly)
-    # If file is huge, this might be memory intensive. 
-    # For better memory usage, we could read chunk by chunk, update md5, and write to temp file.
-    # But for simplicity and assuming reasonable file sizes for this demo:
-    
-    filename = os.path.basename(file.filename)
-    file_path = os.path.join(save_dir, filename)
-    
-    # Handle duplicate filenames: append _1, _2, etc.
-    if os.path.exists(file_path):
-        root, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(file_path):
-            new_filename = f"{root}_{counter}{ext}"
-            file_path = os.path.join(save_dir, new_filename)
-            counter += 1
-        filename = os.path.basename(file_path)
-    
-    with open(file_path, "wb") as f:
-        f.write(content)
-        
-    file_size = len(content)
-    
+    max_size = get_max_upload_size()
+    hash_md5 = hashlib.md5()
+    file_size = 0
+
+    # Temp file lives next to the blobs so publishing it never crosses filesystems
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, prefix=".upload-", suffix=".part")
+    os.close(fd)
+    os.chmod(tmp_path, 0o644)
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if max_size and file_size > max_size:
+                    raise UploadTooLargeError(f"File exceeds maximum upload size of {max_size} bytes")
+                hash_md5.update(chunk)
+                await f.write(chunk)
+
+        md5 = hash_md5.hexdigest()
+        filename = safe_filename(file.filename, md5)
+        file_path = await asyncio.to_thread(blob_store.add, tmp_path, md5, file_size, filename)
+    finally:
+        os.remove(tmp_path)
+
     # URL construction (relative path)
-    url = f"/{save_dir}/{filename}"
-    
+    url = f"/{file_path}"
+
     return {
         "path": file_path,
         "url": url,
@@ -0,0 +1,129 @@
+import base64
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from PIL import Image, ImageOps
+
+STATIC_ROOT = "static"
+STATIC_PREFIX = "/static/"
+
+
+def local_image_url(item: Any) -> Optional[str]:
+    """The URL of an image_url item if it points at our own /static files (a path, not an absolute URL)."""
+    if not isinstance(item, dict) or item.get("type") != "image_url" or not isinstance(item.get("image_url"), dict):
+        return None
+    url = item["image_url"].get("url")
+    if not isinstance(url, str) or not url.startswith(STATIC_PREFIX):
+        return None
+    return url
+
+
+def resolve_local_path(url: str) -> Optional[str]:
+    """
+    Map a /static/... URL to a file under the static directory.
+    Returns None if there is no such file, including paths that escape the directory via .. or symlinks.
+    """
+    path = unquote(urlsplit(url).path)
+    if not path.startswith(STATIC_PREFIX):
+        return None
+    root = os.path.realpath(STATIC_ROOT)
+    full = os.path.realpath(os.path.join(root, path[len(STATIC_PREFIX):]))
+    if os.path.commonpath([root, full]) != root or not os.path.isfile(full):
+        return None
+    return full
+
+
+class ImageInliner:
+    """
+    Replaces local /static image references in embedding inputs with downscaled, base64-encoded JPEG data URLs,
+    so the embedding API never has to fetch from our storage and never receives full-resolution renders.
+    Encoded images are kept in a small LRU keyed by path, mtime and size.
+    render_missing(path relative to static) is given a chance to create a missing file, e.g. a deferred PDF page.
+    """
+
+    def __init__(self, render_missing: Optional[Callable[[str], bool]] = None) -> None:
+        self.render_missing = render_missing
+        self.max_side = int(os.getenv("EMBEDDING_IMAGE_MAX_SIDE", "1024"))
+        self.quality = int(os.getenv("EMBEDDING_IMAGE_QUALITY", "85"))
+        self.cache_bytes = int(float(os.getenv("EMBEDDING_IMAGE_CACHE_MB", "64")) * 2 ** 20)
+        self.cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self.cached_bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "bytesIn": 0, "bytesOut": 0}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Items as used for the embedding cache key: local image URLs get the file's mtime and size appended,
+        so re-rendering a page at another size doesn't return the old embedding.
+        """
+        out = []
+        for item in items:
+            url = local_image_url(item)
+            path = resolve_local_path(url) if url else None
+            if path is not None:
+                st = os.stat(path)
+                item = {**item, "image_url": {**item["image_url"], "url": f"{url}#{st.st_mtime_ns}-{st.st_size}"}}
+            out.append(item)
+        return out
+
+    def _encode(self, path: str) -> Tuple[str, int]:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            if self.max_side > 0:
+                image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+        data = buffer.getvalue()
+        return "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii"), len(data)
+
+    def data_url(self, path: str) -> str:
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            url = self.cache.get(key)
+            if url is not None:
+                self.cache.move_to_end(key)
+                self.counters["hits"] += 1
+                return url
+        url, size = self._encode(path)
+        with self._lock:
+            self.counters["misses"] += 1
+            self.counters["bytesIn"] += st.st_size
+            self.counters["bytesOut"] += size
+            if key not in self.cache and len(url) <= self.cache_bytes:
+                self.cache[key] = url
+                self.cached_bytes += len(url)
+                while self.cached_bytes > self.cache_bytes:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cached_bytes -= len(evicted)
+        return url
+
+    def inline(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Items with local image URLs replaced by data URLs; other items are returned unchanged."""
+        out = []
+        for item in items:
+            url = local_image_url(item)
+            if url:
+                path = resolve_local_path(url)
+                if path is None and self.render_missing and self.render_missing(unquote(urlsplit(url).path)[len(STATIC_PREFIX):]):
+                    path = resolve_local_path(url)
+                if path is None:
+                    raise ValueError(f"Image not found: {url}")
+                item = {**item, "image_url": {**item["image_url"], "url": self.data_url(path)}}
+            out.append(item)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "cachedItems": len(self.cache), "cachedBytes": self.cached_bytes}
@@ -0,0 +1,243 @@
+import asyncio
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from bs4 import BeautifulSoup
+
+from utils.chunking import chunk_segments, chunk_text
+from utils.converter import get_file_kind, is_error_text, process_file
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 100
+
+
+def table_html_to_text(html: str) -> str:
+    """Flatten converted spreadsheet HTML to one line per row, cells separated by ' | '."""
+    soup = BeautifulSoup(html, "html.parser")
+    lines = []
+    for row in soup.find_all("tr"):
+        cells = [cell.get_text(" ", strip=True) for cell in row.find_all(["td", "th"])]
+        if any(cells):
+            lines.append(" | ".join(cells))
+    return "\n".join(lines) if lines else soup.get_text("\n", strip=True)
+
+
+def page_number(url: str) -> Optional[int]:
+    name = os.path.splitext(os.path.basename(url))[0]
+    return int(name) if name.isdigit() else None
+
+
+class UnitBuilder:
+    """Turns conversion output into units: {"id", "items", "metadata"}, one point each."""
+
+    def __init__(self, file_info: Dict[str, Any], chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP) -> None:
+        self.file_info = file_info
+        self.kind = get_file_kind(file_info['name'], file_info['contentType'] or "")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.pages: Set[int] = set()
+
+    def _unit(self, suffix: str, items: List[Dict[str, Any]], **metadata: Any) -> Dict[str, Any]:
+        md5 = self.file_info['md5']
+        return {
+            # Stable per file and position, so ingesting the same file again overwrites its points
+            "id": f"{md5}#{suffix}",
+            "items": items,
+            "metadata": {
+                "md5": md5,
+                "file": self.file_info['name'],
+                "url": self.file_info['url'],
+                "kind": self.kind,
+                **metadata,
+            },
+        }
+
+    def page(self, page: int, url: str) -> Dict[str, Any]:
+        self.pages.add(page)
+        return self._unit(f"page-{page}", [{"type": "image_url", "image_url": {"url": url}}], page=page, image=url)
+
+    def text_chunks(self, text: str, prefix: str = "chunk", **metadata: Any) -> List[Dict[str, Any]]:
+        return [
+            self._unit(f"{prefix}-{i}", [{"type": "text", "text": chunk["text"]}], chunk=i, charStart=chunk["start"], charEnd=chunk["end"], **metadata)
+            for i, chunk in enumerate(chunk_text(text, self.chunk_size, self.chunk_overlap))
+        ]
+
+    def from_result(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Units not already produced while converting."""
+        units = []
+        if result["pdf"]:
+            for url in result["images"]:
+                page = page_number(url)
+                if page is not None and page not in self.pages:
+                    units.append(self.page(page, url))
+            # Pages with a text layer are embedded as text; scanned ones only through their image
+            for info in result.get("pageTexts") or []:
+                if not info["scanned"]:
+                    units.extend(self.text_chunks(info["text"], prefix=f"page-{info['page']}-chunk", page=info["page"]))
+        elif result["frames"]:
+            for i, frame in enumerate(result["frames"]):
+                items = [{"type": "image_url", "image_url": {"url": frame["url"]}}]
+                if frame.get("text"):
+                    items.append({"type": "text", "text": frame["text"]})
+                units.append(self._unit(f"frame-{i}", items, frame=i, time=frame["time"], image=frame["url"]))
+        elif result["segments"]:
+            for i, chunk in enumerate(chunk_segments(result["segments"], self.chunk_size)):
+                units.append(self._unit(f"segment-{i}", [{"type": "text", "text": chunk["text"]}], chunk=i, start=chunk["start"], end=chunk["end"]))
+        elif result.get("sheets") and "text" in result["sheets"][0]:
+            for i, sheet in enumerate(result["sheets"]):
+                text = sheet["text"]
+                if text.startswith("<table>"):
+                    text = table_html_to_text(text)
+                units.extend(self.text_chunks(text, prefix=f"sheet-{i}-chunk", sheet=sheet["name"]))
+        elif result.get("textChunks"):
+            for i, chunk in enumerate(result["textChunks"]):
+                units.append(self._unit(
+                    f"chunk-{i}", [{"type": "text", "text": chunk["text"]}], chunk=i,
+                    charStart=chunk["start"], charEnd=chunk["end"], byteStart=chunk["byteStart"], byteEnd=chunk["byteEnd"],
+                ))
+        elif result["text"] and not is_error_text(result["text"]):
+            text = result["text"]
+            if self.kind == "excel":
+                text = table_html_to_text(text)
+            units.extend(self.text_chunks(text))
+        return units
+
+
+def produce_units(file_info: Dict[str, Any], options: Dict[str, Any], emit: Callable[[Dict[str, Any]], None], chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    """
+    Worker-pool side of the pipeline: convert the file, emitting units as they become available.
+    emit may block while the embedders catch up. Fails only when the conversion yields nothing to embed;
+    partial output, such as the pages rendered before a failure, is still ingested.
+    """
+    builder = UnitBuilder(file_info, chunk_size, chunk_overlap)
+    emitted = 0
+
+    def on_page(page: int, url: str) -> None:
+        nonlocal emitted
+        emit(builder.page(page, url))
+        emitted += 1
+
+    result = process_file(file_info, **options, on_page=on_page)
+    units = builder.from_result(result)
+    if not units and not emitted:
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        raise RuntimeError(result["text"] if is_error_text(result["text"]) else "Conversion produced nothing to embed")
+    for unit in units:
+        emit(unit)
+    return result
+
+
+class IngestPipeline:
+    """
+    Runs conversion, embedding and batched upserts concurrently and yields (event, data) progress events:
+    "file" once the upload is known, "converted" when conversion finishes, "progress" after each batch,
+    "error" for failures, and a final "done".
+    """
+
+    def __init__(self, engine, pool, collection: str, instructions: Callable[[List[Dict[str, Any]]], str],
+                 batch_size: int = 64, concurrency: int = 8, profile: Any = None, use_cache: bool = True,
+                 max_queued: Optional[int] = None) -> None:
+        self.engine = engine
+        self.pool = pool
+        self.collection = collection
+        self.instructions = instructions
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.profile = profile
+        self.use_cache = use_cache
+        # Units converted but not yet embedded; conversion waits when this many are queued
+        self.max_queued = max_queued or 2 * max(self.batch_size, self.concurrency)
+        self.counters = {"units": 0, "embedded": 0, "stored": 0, "failed": 0}
+
+    async def run(self, kind: str, file_info: Dict[str, Any], options: Dict[str, Any],
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        units: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued)
+        events: asyncio.Queue = asyncio.Queue()
+        pending: List[Dict[str, Any]] = []
+        flush_lock = asyncio.Lock()
+        stopped = threading.Event()
+
+        async def enqueue(unit: Dict[str, Any]) -> None:
+            self.counters["units"] += 1
+            await units.put(unit)
+
+        def emit(unit: Dict[str, Any]) -> None:
+            # Called from conversion threads; blocks while the queue is full, so a fast converter can't
+            # pile up units (and page images) faster than they are embedded
+            if stopped.is_set():
+                return
+            asyncio.run_coroutine_threadsafe(enqueue(unit), loop).result()
+
+        async def convert() -> None:
+            try:
+                result = await self.pool.run(kind, produce_units, file_info, options, emit, chunk_size, chunk_overlap)
+                await events.put(("converted", {"pageCount": result["pageCount"], "units": self.counters["units"]}))
+            except Exception as e:
+                await events.put(("error", {"stage": "convert", "message": str(e)}))
+            # Not on cancellation: the embedders are cancelled along with this task
+            for _ in range(self.concurrency):
+                await units.put(None)
+
+        async def flush(force: bool) -> None:
+            async with flush_lock:
+                while len(pending) >= self.batch_size or (force and pending):
+                    batch = pending[:self.batch_size]
+                    del pending[:self.batch_size]
+                    try:
+                        errors = await self.engine.upsert_vectors(batch, self.collection, batch_size=self.batch_size, profile=self.profile)
+                    except Exception as e:
+                        errors = [str(e)] * len(batch)
+                    failed = [e for e in errors if e]
+                    self.counters["stored"] += len(errors) - len(failed)
+                    self.counters["failed"] += len(failed)
+                    if failed:
+                        await events.put(("error", {"stage": "store", "message": failed[0], "count": len(failed)}))
+                    await events.put(("progress", dict(self.counters)))
+
+        async def embed() -> None:
+            while True:
+                unit = await units.get()
+                if unit is None:
+                    return
+                try:
+                    vector = await self.engine.get_embedding(unit["items"], self.instructions(unit["items"]), use_cache=self.use_cache)
+                except Exception as e:
+                    self.counters["failed"] += 1
+                    await events.put(("error", {"stage": "embed", "id": unit["id"], "message": str(e)}))
+                    continue
+                self.counters["embedded"] += 1
+                pending.append({
+                    "id": self.engine.point_id(unit["id"]),
+                    "vector": vector,
+                    "payload": {"items": unit["items"], **unit["metadata"]},
+                })
+                if len(pending) >= self.batch_size:
+                    await flush(False)
+
+        async def pipeline() -> None:
+            try:
+                await asyncio.gather(convert(), *(embed() for _ in range(self.concurrency)))
+                await flush(True)
+            finally:
+                await events.put(None)
+
+        yield "file", {"md5": file_info['md5'], "name": file_info['name'], "url": file_info['url'], "collection": self.collection}
+        task = asyncio.create_task(pipeline())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            yield "done", dict(self.counters)
+        finally:
+            # The client went away: stop embedding (conversion finishes on its own and stays cached)
+            if not task.done():
+                task.cancel()
+            # Release a conversion thread waiting for room in the queue; whatever it emits from now on is dropped
+            stopped.set()
+            while not units.empty():
+                units.get_nowait()
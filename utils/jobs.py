@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
+JOB_DB_PATH = os.path.join("data", "jobs.db")
+
+# Worker kinds and their default concurrency. Conversions are subprocess (soffice, pdftoppm, ffmpeg)
+# or ctranslate2 (Whisper) bound and release the GIL, so threads are enough to keep the event loop free.
+DEFAULT_WORKERS = {
+    "office": 2,
+    "pdf": 2,
+    "video": 1,
+    "audio": 1,
+    "default": 4,
+}
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a worker kind has no free slot in its queue."""
+
+
+class WorkerPool:
+    """
+    Bounded thread pools, one per kind of conversion.
+    Each kind accepts at most workers + queue_size pending tasks; beyond that submit fails fast.
+    """
+
+    def __init__(self) -> None:
+        queue_size = int(os.getenv("WORKER_QUEUE_SIZE", "8"))
+        self.executors: Dict[str, ThreadPoolExecutor] = {}
+        self.capacity: Dict[str, int] = {}
+        self.pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for kind, default in DEFAULT_WORKERS.items():
+            workers = int(os.getenv(f"{kind.upper()}_WORKERS", str(default)))
+            self.executors[kind] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"f2ai-{kind}")
+            self.capacity[kind] = workers + queue_size
+            self.pending[kind] = 0
+
+    def _kind(self, kind: str) -> str:
+        return kind if kind in self.executors else "default"
+
+    def has_capacity(self, kind: str) -> bool:
+        kind = self._kind(kind)
+        with self._lock:
+            return self.pending[kind] < self.capacity[kind]
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args: Any, force: bool = False) -> Future:
+        """Submit fn to the pool for kind. force skips the capacity check (used when resuming jobs)."""
+        kind = self._kind(kind)
+        with self._lock:
+            if not force and self.pending[kind] >= self.capacity[kind]:
+                raise QueueFullError(f"Too many pending {kind} conversions, please retry later")
+            self.pending[kind] += 1
+
+        def release(_: Future) -> None:
+            with self._lock:
+                self.pending[kind] -= 1
+
+        future = self.executors[kind].submit(fn, *args)
+        future.add_done_callback(release)
+        return future
+
+    async def run(self, kind: str, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(kind, fn, *args))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {kind: {"pending": self.pending[kind], "capacity": self.capacity[kind]} for kind in self.executors}
+
+    def shutdown(self) -> None:
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class JobStore:
+    """SQLite-backed job records, so queued work survives a restart."""
+
+    def __init__(self, db_path: str = JOB_DB_PATH) -> None:
+        self.db_path = db_path
+        # pid plus a random suffix: containers often reuse the same pid after a restart
+        self.owner = f"{os.getpid()}:{uuid4().hex[:8]}"
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, owner, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), self.owner, now, now),
+            )
+        return job_id
+
+    def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "params": json.loads(row["params"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"],
+        }
+
+    def active_md5s(self) -> Set[str]:
+        """md5s of the uploads that queued or running jobs will read."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT params FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        md5s = set()
+        for row in rows:
+            md5 = (json.loads(row["params"]).get("file") or {}).get("md5")
+            if md5:
+                md5s.add(md5)
+        return md5s
+
+    def claim_orphans(self) -> List[Dict[str, Any]]:
+        """Take over unfinished jobs whose owning process is gone. Returns the claimed jobs."""
+        claimed = []
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+            for row in rows:
+                if not _owner_gone(row["owner"], self.owner):
+                    continue
+                # Compare-and-set on owner so only one restarted worker picks up each job
+                cur = conn.execute(
+                    "UPDATE jobs SET owner = ?, status = 'queued', updated_at = ? WHERE id = ? AND owner IS ?",
+                    (self.owner, time.time(), row["id"], row["owner"]),
+                )
+                if cur.rowcount:
+                    claimed.append(row["id"])
+        return [job for job in (self.get(job_id) for job_id in claimed) if job]
+
+
+class JobManager:
+    """Runs handler(params) for persisted jobs on the worker pool."""
+
+    def __init__(self, store: JobStore, pool: WorkerPool, handler: Callable[[Dict[str, Any]], Any]) -> None:
+        self.store = store
+        self.pool = pool
+        self.handler = handler
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        if not self.pool.has_capacity(kind):
+            raise QueueFullError(f"Too many pending {kind} conversions, please retry later")
+        job_id = self.store.create(kind, params)
+        try:
+            self.pool.submit(kind, self._run, job_id, params)
+        except QueueFullError as e:
+            self.store.update(job_id, "failed", error=str(e))
+            raise
+        return job_id
+
+    def _run(self, job_id: str, params: Dict[str, Any]) -> None:
+        self.store.update(job_id, "running")
+        try:
+            result = self.handler(params)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, "failed", error=str(e))
+        else:
+            self.store.update(job_id, "done", result=result)
+
+    def resume(self) -> int:
+        """Requeue jobs left unfinished by a previous process. Returns the number resumed."""
+        jobs = self.store.claim_orphans()
+        for job in jobs:
+            self.pool.submit(job["kind"], self._run, job["id"], job["params"], force=True)
+        return len(jobs)
+
+
+def _owner_gone(owner: Optional[str], current: str) -> bool:
+    if not owner:
+        return True
+    if owner == current:
+        return False
+    pid = int(owner.split(":", 1)[0])
+    if pid == os.getpid():
+        # Same pid but a different token: that owner was a previous run of this process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
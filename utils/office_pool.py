@@ -0,0 +1,235 @@
+import atexit
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from typing import List, Optional
+
+PROFILE_ROOT = os.path.join(tempfile.gettempdir(), "f2ai-office")
+
+
+class OfficeConversionError(RuntimeError):
+    """Raised when a pooled LibreOffice instance fails to convert a document."""
+
+
+class TimeoutTransport(xmlrpc.client.Transport):
+    """XML-RPC transport with a socket timeout, used as the per-document timeout."""
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__()
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+        return conn
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class OfficeInstance:
+    """
+    One long-lived headless LibreOffice driven through unoserver's XML-RPC listener.
+    Each instance has its own user profile, so instances never contend for a profile lock.
+    """
+
+    def __init__(self, index: int, python: str, startup_timeout: float) -> None:
+        self.index = index
+        self.python = python
+        self.startup_timeout = startup_timeout
+        self.profile_dir = os.path.join(PROFILE_ROOT, f"{os.getpid()}-{index}")
+        self.process: Optional[subprocess.Popen] = None
+        self.port = 0
+        self.conversions = 0
+
+    def start(self) -> None:
+        self.port = _free_port()
+        cmd = [
+            self.python, "-m", "unoserver.server",
+            "--interface", "127.0.0.1",
+            "--port", str(self.port),
+            "--uno-port", str(_free_port()),
+            "--user-installation", f"file://{os.path.abspath(self.profile_dir)}",
+        ]
+        # New session so stop() can take down unoserver together with its soffice child
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        self.conversions = 0
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.healthy():
+                return
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.2)
+        self.stop()
+        raise OfficeConversionError(f"LibreOffice instance {self.index} failed to start")
+
+    def stop(self) -> None:
+        if self.process and self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGTERM)
+                self.process.wait(timeout=10)
+            except (ProcessLookupError, subprocess.TimeoutExpired):
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        self.process = None
+
+    def restart(self) -> None:
+        self.stop()
+        self.start()
+
+    def healthy(self) -> bool:
+        if not self.process or self.process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def convert(self, input_path: str, output_path: str, convert_to: str, timeout: float) -> None:
+        proxy = xmlrpc.client.ServerProxy(
+            f"http://127.0.0.1:{self.port}", allow_none=True, transport=TimeoutTransport(timeout)
+        )
+        proxy.convert(os.path.abspath(input_path), None, os.path.abspath(output_path), convert_to)
+        self.conversions += 1
+
+
+class OfficePool:
+    """
+    Pool of warm LibreOffice instances.
+    Instances are started on first use (or by start()), health-checked before each conversion,
+    and recycled after a crash, a timeout or OFFICE_MAX_CONVERSIONS documents.
+    """
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.max_conversions = 0
+        self.timeout = 0.0
+        self.instances: List[OfficeInstance] = []
+        self.idle: "queue.Queue[OfficeInstance]" = queue.Queue()
+        self.available = False
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> bool:
+        """Start all instances. Returns False if the pool is disabled or unoserver is unavailable."""
+        with self._lock:
+            if self._started:
+                return self.available
+            self._started = True
+            # Settings are read here rather than in __init__, which runs before main.py loads .env
+            self.size = int(os.getenv("OFFICE_POOL_SIZE", "2"))
+            self.max_conversions = int(os.getenv("OFFICE_MAX_CONVERSIONS", "200"))
+            self.timeout = float(os.getenv("OFFICE_CONVERT_TIMEOUT", "120"))
+            python = os.getenv("UNOSERVER_PYTHON", "/usr/bin/python3")
+            startup_timeout = float(os.getenv("OFFICE_STARTUP_TIMEOUT", "30"))
+            if self.size <= 0:
+                return False
+            for i in range(self.size):
+                instance = OfficeInstance(i, python, startup_timeout)
+                try:
+                    instance.start()
+                except (OSError, OfficeConversionError) as e:
+                    print(f"LibreOffice pool unavailable, falling back to cold soffice: {e}")
+                    self._stop_all()
+                    return False
+                self.instances.append(instance)
+                self.idle.put(instance)
+            self.available = True
+            atexit.register(self.stop)
+            return True
+
+    def _stop_all(self) -> None:
+        for instance in self.instances:
+            instance.stop()
+            # Only this process's profiles: other uvicorn workers may still be using theirs
+            shutil.rmtree(instance.profile_dir, ignore_errors=True)
+        self.instances = []
+
+    def stop(self) -> None:
+        with self._lock:
+            self.available = False
+            self._stop_all()
+
+    def check(self) -> None:
+        """Restart idle instances that have died."""
+        for _ in range(self.idle.qsize()):
+            try:
+                instance = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if not instance.healthy():
+                    print(f"LibreOffice instance {instance.index} is unhealthy, restarting")
+                    instance.restart()
+            except OfficeConversionError as e:
+                print(f"Error restarting LibreOffice instance: {e}")
+            finally:
+                self.idle.put(instance)
+
+    def convert(self, input_path: str, output_path: str, convert_to: str) -> None:
+        instance = self.idle.get()
+        try:
+            if not instance.healthy():
+                instance.restart()
+            try:
+                instance.convert(input_path, output_path, convert_to, self.timeout)
+            except (OSError, xmlrpc.client.Error) as e:
+                # Timeouts and crashes leave the instance in an unknown state
+                instance.restart()
+                raise OfficeConversionError(f"LibreOffice conversion failed: {e}")
+            if instance.conversions >= self.max_conversions:
+                instance.restart()
+        finally:
+            self.idle.put(instance)
+
+
+def convert_with_soffice(input_path: str, output_dir: str, convert_to: str) -> None:
+    """
+    Cold fallback: one soffice process per document.
+    Every worker thread gets its own profile so concurrent runs don't fight over the profile lock.
+    """
+    profile_dir = os.path.join(PROFILE_ROOT, f"cold-{os.getpid()}-{threading.current_thread().name}")
+    cmd = [
+        "soffice",
+        f"-env:UserInstallation=file://{os.path.abspath(profile_dir)}",
+        "--headless",
+        "--convert-to",
+        convert_to,
+        "--outdir",
+        output_dir,
+        input_path
+    ]
+    timeout = float(os.getenv("OFFICE_CONVERT_TIMEOUT", "120"))
+    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+
+
+office_pool = OfficePool()
+
+
+def convert_office_document(input_path: str, output_dir: str, convert_to: str) -> str:
+    """
+    Convert input_path to output_dir/<basename>.<convert_to>, using the warm pool when available.
+    Returns the output path.
+    """
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(output_dir, f"{base_name}.{convert_to}")
+    if office_pool.start():
+        office_pool.convert(input_path, output_path, convert_to)
+    else:
+        convert_with_soffice(input_path, output_dir, convert_to)
+    return output_path
@@ -0,0 +1,13 @@
+from typing import Any, Dict, Optional, Sequence
+
+
+def merge_options(defaults: Dict[str, Any], options: Optional[Dict[str, Any]] = None, modes: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    defaults overridden by the per-request options that are set (None keeps the default).
+    With modes, options["mode"] must be one of them.
+    """
+    merged = dict(defaults)
+    merged.update({k: v for k, v in (options or {}).items() if v is not None})
+    if modes is not None and merged.get("mode") not in modes:
+        raise ValueError(f"Invalid mode: {merged.get('mode')}")
+    return merged
@@ -0,0 +1,193 @@
+import os
+import re
+import subprocess
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Resolution used when no box is given, same as the pdf2image default used before
+RENDER_DPI = 200
+JPEG_QUALITY = 90
+
+_PAGE_SIZE_RE = re.compile(r"^Page\s+(\d+)\s+size:\s+([\d.]+)\s+x\s+([\d.]+)", re.M)
+_PAGE_ROT_RE = re.compile(r"^Page\s+(\d+)\s+rot:\s+(\d+)", re.M)
+
+# Text layer handling for PDFs: "on" extracts it alongside rendering, "prefer" renders only pages without one
+PDF_TEXT_MODES = ("off", "on", "prefer")
+
+
+def get_render_workers() -> int:
+    return int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def get_pdf_page_sizes(pdf_path: str) -> List[Tuple[float, float]]:
+    """
+    Return (width, height) in points for every page, with page rotation applied.
+    pdfinfo clamps -l to the last page, so one call covers the whole document.
+    """
+    out = subprocess.run(
+        ["pdfinfo", "-f", "1", "-l", "1000000", pdf_path],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ).stdout.decode("utf-8", errors="replace")
+    rotations = {int(m.group(1)): int(m.group(2)) for m in _PAGE_ROT_RE.finditer(out)}
+    sizes = []
+    for m in _PAGE_SIZE_RE.finditer(out):
+        page, width, height = int(m.group(1)), float(m.group(2)), float(m.group(3))
+        if rotations.get(page, 0) % 180 == 90:
+            width, height = height, width
+        sizes.append((width, height))
+    return sizes
+
+
+def get_render_size(page_size: Tuple[float, float], max_width: int = None, max_height: int = None) -> Tuple[int, int]:
+    """Pixel size of a page rendered at RENDER_DPI, shrunk (never enlarged) to fit max_width x max_height."""
+    width = page_size[0] * RENDER_DPI / 72
+    height = page_size[1] * RENDER_DPI / 72
+    scale = 1.0
+    if max_width and max_height:
+        scale = min(1.0, max_width / width, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def render_pdf_pages(pdf_path: str, output_dir: str, first: int, last: int, size: Tuple[int, int]) -> List[str]:
+    """
+    Rasterize pages first..last straight to JPEG at the given pixel size with one pdftoppm call.
+    Pages are written as <page>.jpg in output_dir. Returns their paths.
+    """
+    prefix = os.path.join(output_dir, f".render-{first}-{os.getpid()}-{threading.get_ident()}")
+    cmd = [
+        "pdftoppm",
+        "-f", str(first),
+        "-l", str(last),
+        "-scale-to-x", str(size[0]),
+        "-scale-to-y", str(size[1]),
+        "-jpeg",
+        "-jpegopt", f"quality={JPEG_QUALITY}",
+        pdf_path,
+        prefix
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # pdftoppm zero-pads page numbers by the document's page count, so match on the number itself
+    paths = []
+    base = os.path.basename(prefix)
+    for name in os.listdir(output_dir):
+        if name.startswith(base + "-") and name.endswith(".jpg"):
+            page = int(name[len(base) + 1:-4])
+            path = os.path.join(output_dir, f"{page}.jpg")
+            os.replace(os.path.join(output_dir, name), path)
+            paths.append((page, path))
+    return [path for _, path in sorted(paths)]
+
+
+def parse_page_range(spec: Optional[str], page_count: int) -> List[int]:
+    """
+    Parse a page selection like "1-3,5,8-" into sorted 1-based page numbers.
+    Pages past the end of the document are dropped, so "20-" of a 10-page document selects nothing;
+    None or "" selects every page.
+    """
+    if not spec or not spec.strip():
+        return list(range(1, page_count + 1))
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        try:
+            first = int(start) if start.strip() else 1
+            last = (int(end) if end.strip() else max(first, page_count)) if sep else first
+        except ValueError:
+            raise ValueError(f"Invalid page range: {spec}")
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {spec}")
+        pages.update(range(first, min(last, page_count) + 1))
+    return sorted(pages)
+
+
+def plan_chunks(sizes: List[Tuple[int, int]], pages: List[int], chunk_size: int) -> List[Tuple[int, int, Tuple[int, int]]]:
+    """Group consecutive pages that share a render size into (first, last, size) ranges."""
+    chunks = []
+    for page in pages:
+        size = sizes[page - 1]
+        if chunks:
+            first, last, chunk_size_px = chunks[-1]
+            if page == last + 1 and size == chunk_size_px and last - first + 1 < chunk_size:
+                chunks[-1] = (first, page, size)
+                continue
+        chunks.append((page, page, size))
+    return chunks
+
+
+def render_pdf(pdf_path: str, output_dir: str, max_width: int = None, max_height: int = None,
+               pages: Optional[List[int]] = None,
+               on_page: Optional[Callable[[int, str], None]] = None,
+               page_sizes: Optional[List[Tuple[float, float]]] = None) -> List[str]:
+    """
+    Render a PDF page by page across a pool of pdftoppm processes.
+    Memory is bounded by the number of workers rather than the number of pages.
+    on_page(page, path) is called as soon as each page image is written.
+    page_sizes from get_pdf_page_sizes saves running pdfinfo again when the caller already has them.
+    Returns image paths in page order.
+    """
+    if page_sizes is None:
+        page_sizes = get_pdf_page_sizes(pdf_path)
+    render_sizes = [get_render_size(size, max_width, max_height) for size in page_sizes]
+    if pages is None:
+        pages = list(range(1, len(page_sizes) + 1))
+    chunk_size = int(os.getenv("PDF_RENDER_CHUNK", "4"))
+    chunks = plan_chunks(render_sizes, pages, chunk_size)
+
+    def work(chunk: Tuple[int, int, Tuple[int, int]]) -> List[str]:
+        first, last, size = chunk
+        paths = render_pdf_pages(pdf_path, output_dir, first, last, size)
+        if on_page:
+            for page, path in zip(range(first, last + 1), paths):
+                on_page(page, path)
+        return paths
+
+    with ThreadPoolExecutor(max_workers=get_render_workers()) as executor:
+        results = list(executor.map(work, chunks))
+    return [path for paths in results for path in paths]
+
+
+def extract_pdf_text(pdf_path: str, first: int, last: int) -> List[str]:
+    """
+    Text layer of pages first..last in reading order, one string per page, with one pdftotext call.
+    pdftotext ends every page with a form feed, empty pages included.
+    """
+    out = subprocess.run(
+        ["pdftotext", "-f", str(first), "-l", str(last), "-enc", "UTF-8", pdf_path, "-"],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ).stdout.decode("utf-8", errors="replace")
+    texts = out.split("\f")[:last - first + 1]
+    return texts + [""] * (last - first + 1 - len(texts))
+
+
+def _is_junk(ch: str) -> bool:
+    # Fonts without a Unicode mapping come out as replacement, private-use or control characters
+    return ch == "\ufffd" or unicodedata.category(ch) in ("Co", "Cc")
+
+
+def page_text_info(page: int, text: str) -> Dict[str, Any]:
+    """
+    {"page", "text", "chars", "scanned"} for one page.
+    A page counts as scanned (needs the image) when it has fewer than PDF_TEXT_MIN_CHARS visible characters,
+    or when most of them are unmapped glyphs rather than real text.
+    """
+    min_chars = int(os.getenv("PDF_TEXT_MIN_CHARS", "20"))
+    text = text.strip()
+    visible = [ch for ch in text if not ch.isspace()]
+    junk = sum(1 for ch in visible if _is_junk(ch))
+    scanned = len(visible) < min_chars or junk > len(visible) * 0.3
+    return {"page": page, "text": text, "chars": len(visible), "scanned": scanned}
+
+
+def get_page_texts(pdf_path: str, pages: List[int]) -> List[Dict[str, Any]]:
+    """page_text_info for the given 1-based pages."""
+    if not pages:
+        return []
+    first, last = pages[0], pages[-1]
+    texts = extract_pdf_text(pdf_path, first, last)
+    return [page_text_info(page, texts[page - first]) for page in pages]
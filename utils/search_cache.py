@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.embedding_cache import normalize_items
+from utils.single_flight import SingleFlight
+
+
+class SearchCache:
+    """
+    In-process LRU of search results, bounded by entry count and approximate size, with a TTL.
+    Each collection has a generation that writes bump (invalidate); entries from an older generation
+    are never served, including results of searches that were still running when the write landed.
+    Other uvicorn workers don't see this process's invalidations, so the TTL bounds staleness there.
+    """
+
+    def __init__(self) -> None:
+        self.max_items = int(os.getenv("SEARCH_CACHE_ITEMS", "1024"))
+        self.max_bytes = int(float(os.getenv("SEARCH_CACHE_MB", "32")) * 2 ** 20)
+        self.ttl = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+        # key -> (results, collection, generation, created_at, size)
+        self.entries: "OrderedDict[str, Tuple[List[Dict[str, Any]], str, int, float, int]]" = OrderedDict()
+        self.size = 0
+        self.generations: Dict[str, int] = {}
+        # Keyed by (key, generation), so a search started after a write never joins one started before it
+        self.flight = SingleFlight()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0, "stale": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0 and self.ttl > 0
+
+    def key(self, collection: str, model: str, instructions: str, items: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        raw = json.dumps([collection, model, instructions, normalize_items(items), params], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def generation(self, collection: str) -> int:
+        return self.generations.get(collection, 0)
+
+    def invalidate(self, collection: str) -> None:
+        self.generations[collection] = self.generation(collection) + 1
+        self.counters["invalidations"] += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self.entries.pop(key)
+        self.size -= entry[4]
+
+    def _lookup(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        results, collection, generation, created_at, _ = entry
+        if generation != self.generation(collection):
+            self._drop(key)
+            self.counters["stale"] += 1
+            return None
+        if time.time() - created_at > self.ttl:
+            self._drop(key)
+            self.counters["expired"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return results
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        results = self._lookup(key)
+        self.counters["hits" if results is not None else "misses"] += 1
+        return results
+
+    def put(self, key: str, collection: str, generation: int, results: List[Dict[str, Any]]) -> None:
+        """Store results computed while collection was at generation; dropped if it has moved on since."""
+        if not self.enabled or generation != self.generation(collection):
+            return
+        size = len(json.dumps(results, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (results, collection, generation, time.time(), size)
+        self.size += size
+        while len(self.entries) > self.max_items or self.size > self.max_bytes:
+            _, (_, _, _, _, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+            self.counters["evictions"] += 1
+
+    async def get_or_compute(self, key: str, collection: str, compute: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        results = self.get(key)
+        if results is not None:
+            return results
+
+        generation = self.generation(collection)
+
+        async def run() -> List[Dict[str, Any]]:
+            computed = await compute()
+            self.put(key, collection, generation, computed)
+            return computed
+
+        # The same search is already running against the current generation: share its result
+        results, shared = await self.flight.do((key, generation), run)
+        if shared:
+            self.counters["coalesced"] += 1
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hitRatio": round(self.counters["hits"] / lookups, 4) if lookups else None,
+            "items": len(self.entries),
+            "bytes": self.size,
+            "capacityItems": self.max_items,
+            "capacityBytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
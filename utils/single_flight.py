@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Runs at most one compute per key at a time in this event loop; callers that arrive while it runs
+    await the same result (or exception) instead of starting their own.
+    """
+
+    def __init__(self) -> None:
+        self.inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self.inflight)
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, shared); shared is True when the result came from another caller's compute."""
+        future = self.inflight.get(key)
+        if future is not None:
+            # Shielded so a cancelled waiter doesn't cancel the compute others are waiting on
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await compute()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
@@ -0,0 +1,297 @@
+import fcntl
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+BLOB_DIR = "static/blobs"
+UPLOAD_DIR = "static/upload"
+CONVERT_DIR = "static/convert"
+STORAGE_DB_PATH = os.path.join("data", "storage.db")
+
+# Evict down to this share of the quota, so one collection frees enough room to not run again right away
+GC_TARGET_RATIO = 0.9
+
+
+def _is_md5(name: str) -> bool:
+    return len(name) == 32 and all(c in "0123456789abcdef" for c in name)
+
+
+def md5_from_static_path(path: str) -> Optional[str]:
+    """The upload md5 a path relative to the static mount belongs to (upload/<md5>/..., convert/<md5>/...)."""
+    parts = path.lstrip("/").split("/")
+    if len(parts) >= 2 and parts[0] in ("upload", "convert") and _is_md5(parts[1]):
+        return parts[1]
+    return None
+
+
+def _disk_usage(path: str, seen: Set[Tuple[int, int]]) -> int:
+    """Allocated bytes under path; hard links to an inode in seen are not counted again."""
+    total = 0
+    paths = [path] if os.path.isfile(path) else [os.path.join(d, f) for d, _, files in os.walk(path) for f in files]
+    for p in paths:
+        try:
+            st = os.lstat(p)
+        except OSError:
+            continue
+        if (st.st_dev, st.st_ino) in seen:
+            continue
+        seen.add((st.st_dev, st.st_ino))
+        total += st.st_blocks * 512
+    return total
+
+
+class BlobStore:
+    """
+    Each upload is stored once as static/blobs/<md5[:2]>/<md5> and published as hard links under
+    static/upload/<md5>/. collect() evicts least recently used md5s, with their conversions, above STORAGE_QUOTA_MB.
+    """
+
+    def __init__(self, db_path: str = STORAGE_DB_PATH) -> None:
+        self.db_path = db_path
+        # md5 -> last access, written to SQLite by flush() so reads of static files never wait on the database
+        self.touched: Dict[str, float] = {}
+        self.pins: Dict[str, int] = {}
+        self.last_collect: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._ready = False
+
+    # Settings are read on use rather than in __init__, which runs before main.py loads .env
+    @property
+    def quota(self) -> int:
+        return int(float(os.getenv("STORAGE_QUOTA_MB", "0")) * 2 ** 20)
+
+    @property
+    def min_age(self) -> float:
+        return float(os.getenv("STORAGE_GC_MIN_AGE", "3600"))
+
+    def _setup(self) -> None:
+        """Create the blob directory and the database on first use, so importing this module writes nothing."""
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            os.makedirs(BLOB_DIR, exist_ok=True)
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                with conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        """
+                        CREATE TABLE IF NOT EXISTS blobs (
+                            md5 TEXT PRIMARY KEY,
+                            size INTEGER NOT NULL,
+                            created_at REAL NOT NULL,
+                            accessed_at REAL NOT NULL
+                        )
+                        """
+                    )
+            finally:
+                conn.close()
+            self._ready = True
+
+    def _connect(self) -> sqlite3.Connection:
+        self._setup()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def blob_path(self, md5: str) -> str:
+        return os.path.join(BLOB_DIR, md5[:2], md5)
+
+    @contextmanager
+    def lock(self, md5: str) -> Iterator[None]:
+        """Serializes adding and evicting one md5, across threads and uvicorn workers."""
+        lock_dir = os.path.join(BLOB_DIR, md5[:2])
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, f".{md5}.lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def add(self, tmp_path: str, md5: str, size: int, filename: str) -> str:
+        """
+        Store the file at tmp_path (in BLOB_DIR, so links stay on one filesystem) under its md5 and publish it
+        as static/upload/<md5>/<filename>. The caller removes tmp_path. Returns the published path.
+        """
+        blob = self.blob_path(md5)
+        now = time.time()
+        with self.lock(md5):
+            try:
+                os.link(tmp_path, blob)
+            except FileExistsError:
+                pass
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO blobs (md5, size, created_at, accessed_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(md5) DO UPDATE SET accessed_at = excluded.accessed_at",
+                    (md5, size, now, now),
+                )
+            save_dir = os.path.join(UPLOAD_DIR, md5)
+            os.makedirs(save_dir, exist_ok=True)
+            path = os.path.join(save_dir, filename)
+            try:
+                os.link(blob, path)
+            except FileExistsError:
+                # Same md5 and name: normally already this blob; relink anything else that ended up there
+                if not os.path.samefile(blob, path):
+                    tmp_link = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    os.link(blob, tmp_link)
+                    try:
+                        os.replace(tmp_link, path)
+                    finally:
+                        # Gone after a successful replace; otherwise it would be a stray reference to the blob
+                        if os.path.lexists(tmp_link):
+                            os.remove(tmp_link)
+        return path
+
+    def touch(self, md5: Optional[str]) -> None:
+        if md5:
+            with self._lock:
+                self.touched[md5] = time.time()
+
+    @contextmanager
+    def pin(self, md5: str) -> Iterator[None]:
+        """Keep md5 from being evicted while a request in this process uses it."""
+        with self._lock:
+            self.pins[md5] = self.pins.get(md5, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.pins[md5] -= 1
+                if not self.pins[md5]:
+                    del self.pins[md5]
+                self.touched[md5] = time.time()
+
+    def flush(self) -> int:
+        """Write buffered access times. Returns the number of md5s written."""
+        with self._lock:
+            touched, self.touched = self.touched, {}
+        if touched:
+            with self._connect() as conn:
+                conn.executemany(
+                    "UPDATE blobs SET accessed_at = MAX(accessed_at, ?) WHERE md5 = ?",
+                    [(at, md5) for md5, at in touched.items()],
+                )
+        return len(touched)
+
+    def _accessed_at(self, conn: sqlite3.Connection) -> Dict[str, float]:
+        return {row["md5"]: row["accessed_at"] for row in conn.execute("SELECT md5, accessed_at FROM blobs")}
+
+    def _scan(self) -> Dict[str, Dict[str, Any]]:
+        """{md5: {"bytes", "accessedAt"}} for every md5 with files on disk."""
+        with self._connect() as conn:
+            accessed = self._accessed_at(conn)
+        md5s = set(accessed)
+        for root in (UPLOAD_DIR, CONVERT_DIR):
+            if os.path.isdir(root):
+                md5s.update(name for name in os.listdir(root) if _is_md5(name))
+
+        entries = {}
+        seen: Set[Tuple[int, int]] = set()
+        for md5 in md5s:
+            paths = [self.blob_path(md5), os.path.join(UPLOAD_DIR, md5), os.path.join(CONVERT_DIR, md5)]
+            size = sum(_disk_usage(p, seen) for p in paths if os.path.exists(p))
+            if md5 in accessed:
+                at = accessed[md5]
+            else:
+                # Artifacts from before access tracking: their newest modification stands in for the last access
+                at = max((os.path.getmtime(p) for p in paths if os.path.exists(p)), default=0.0)
+            entries[md5] = {"bytes": size, "accessedAt": at}
+        return entries
+
+    def _evict(self, md5: str, cutoff: float) -> bool:
+        with self.lock(md5):
+            with self._connect() as conn:
+                row = conn.execute("SELECT accessed_at FROM blobs WHERE md5 = ?", (md5,)).fetchone()
+            with self._lock:
+                recent = self.touched.get(md5, 0) > cutoff or md5 in self.pins
+            if recent or (row and row["accessed_at"] > cutoff):
+                return False
+            convert_dir = os.path.join(CONVERT_DIR, md5)
+            if os.path.isdir(convert_dir):
+                # Conversions hold this lock (see ConversionCache.lock); skip the md5 if one is running
+                with open(os.path.join(convert_dir, ".lock"), "w") as f:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        return False
+                    shutil.rmtree(convert_dir, ignore_errors=True)
+            shutil.rmtree(os.path.join(UPLOAD_DIR, md5), ignore_errors=True)
+            try:
+                os.remove(self.blob_path(md5))
+            except FileNotFoundError:
+                pass
+            with self._connect() as conn:
+                conn.execute("DELETE FROM blobs WHERE md5 = ?", (md5,))
+        return True
+
+    @contextmanager
+    def _collect_lock(self) -> Iterator[bool]:
+        # One collection at a time across uvicorn workers; the others skip their turn
+        self._setup()
+        with open(os.path.join(BLOB_DIR, ".gc.lock"), "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def collect(self, active: Set[str]) -> Dict[str, Any]:
+        """
+        Evict least recently used md5s until usage is under GC_TARGET_RATIO of the quota.
+        active holds md5s referenced by queued or running jobs.
+        """
+        self.flush()
+        quota = self.quota
+        if not quota:
+            return {"quota": 0}
+        with self._collect_lock() as acquired:
+            if not acquired:
+                return {"quota": quota, "skipped": True}
+            entries = self._scan()
+            usage = sum(e["bytes"] for e in entries.values())
+            stats = {"quota": quota, "usage": usage, "evicted": 0, "freed": 0, "at": time.time()}
+            if usage > quota:
+                target = quota * GC_TARGET_RATIO
+                cutoff = time.time() - self.min_age
+                for md5, entry in sorted(entries.items(), key=lambda item: item[1]["accessedAt"]):
+                    if usage <= target:
+                        break
+                    if md5 in active or entry["accessedAt"] > cutoff:
+                        continue
+                    if self._evict(md5, cutoff):
+                        usage -= entry["bytes"]
+                        stats["evicted"] += 1
+                        stats["freed"] += entry["bytes"]
+                stats["usage"] = usage
+            self.last_collect = stats
+            return stats
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS bytes FROM blobs").fetchone()
+        with self._lock:
+            pinned = len(self.pins)
+        return {
+            "blobs": row["blobs"],
+            "blobBytes": row["bytes"],
+            "quota": self.quota,
+            "pinned": pinned,
+            "lastCollect": self.last_collect,
+        }
+
+
+blob_store = BlobStore()
@@ -0,0 +1,119 @@
+import codecs
+import os
+from typing import Any, Dict, Iterator, Tuple
+
+from utils.chunking import chunk_stream
+from utils.options import merge_options
+
+DEFAULT_TEXT_OPTIONS = {
+    # inline: text in the response; chunks: a list of chunks with offsets; file: URL of the extracted UTF-8 text
+    "mode": "inline",
+    # Character cap; None means TEXT_MAX_CHARS for inline/chunks and no cap for file, 0 means no cap
+    "max_chars": None,
+    "chunk_size": 1000,
+    "chunk_overlap": 100,
+}
+
+TEXT_MODES = ("inline", "chunks", "file")
+
+SAMPLE_SIZE = 64 * 1024
+BLOCK_SIZE = 1 << 20
+
+# UTF-32 first: its little-endian BOM starts with the UTF-16 one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+# Tried in order on the sample; gb18030 is a superset of GBK
+_CANDIDATE_ENCODINGS = ("utf-8", "gb18030")
+
+
+def get_max_chars() -> int:
+    return int(os.getenv("TEXT_MAX_CHARS", "1000000"))
+
+
+def get_text_options(options: Dict[str, Any] = None) -> Dict[str, Any]:
+    return merge_options(DEFAULT_TEXT_OPTIONS, options, TEXT_MODES)
+
+
+def detect_encoding(path: str, sample_size: int = SAMPLE_SIZE) -> Tuple[str, int]:
+    """
+    (encoding, BOM length) from the first sample_size bytes.
+    A multi-byte character cut off at the end of the sample is not an error. When no candidate fits,
+    UTF-8 is used and invalid bytes are replaced while decoding.
+    """
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+    for encoding in _CANDIDATE_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding, 0
+        except UnicodeDecodeError:
+            continue
+    return "utf-8", 0
+
+
+class TextReader:
+    """Decodes a text file incrementally. chars and truncated are updated as blocks are read."""
+
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE) -> None:
+        self.path = path
+        self.block_size = block_size
+        self.encoding, self.offset = detect_encoding(path)
+        self.chars = 0
+        self.truncated = False
+
+    def blocks(self, max_chars: int = 0) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            while True:
+                data = f.read(self.block_size)
+                text = decoder.decode(data, final=not data)
+                if max_chars and self.chars + len(text) > max_chars:
+                    text = text[:max_chars - self.chars]
+                    self.truncated = True
+                if text:
+                    self.chars += len(text)
+                    yield text
+                if not data or self.truncated:
+                    return
+
+
+def extract_text(path: str, output_dir: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Read a text upload in the requested mode.
+    Returns {"text", "textChunks", "textUrl", "encoding", "textTruncated"}; only the field of the mode is set.
+    Chunks are {"text", "start", "end", "byteStart", "byteEnd"}, byte offsets into the original file.
+    """
+    options = get_text_options(options)
+    mode = options["mode"]
+    max_chars = options["max_chars"]
+    if max_chars is None:
+        max_chars = 0 if mode == "file" else get_max_chars()
+
+    reader = TextReader(path)
+    result = {"text": None, "textChunks": None, "textUrl": None, "encoding": reader.encoding, "textTruncated": False}
+    if mode == "inline":
+        result["text"] = "".join(reader.blocks(int(max_chars)))
+    elif mode == "chunks":
+        result["textChunks"] = list(chunk_stream(
+            reader.blocks(int(max_chars)), int(options["chunk_size"]), int(options["chunk_overlap"]),
+            encoding=reader.encoding, byte_offset=reader.offset,
+        ))
+    else:
+        text_path = os.path.join(output_dir, "text.txt")
+        with open(text_path + ".tmp", "w", encoding="utf-8") as f:
+            for block in reader.blocks(int(max_chars)):
+                f.write(block)
+        os.replace(text_path + ".tmp", text_path)
+        result["textUrl"] = f"/{output_dir}/text.txt"
+    result["textTruncated"] = reader.truncated
+    return result
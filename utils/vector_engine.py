@@ -1,10 +1,18 @@
+import asyncio
 import os
-from typing import Any, Dict, List, Optional
-from uuid import uuid4
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+from uuid import NAMESPACE_URL, UUID, uuid4, uuid5
 
-import httpx
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PointStruct, VectorParams, Filter, FieldCondition, MatchValue
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import PayloadSchemaType, PointStruct, QueryRequest
+
+from utils.ark_client import ArkClient
+from utils.collection_profiles import collection_config, resolve_profile, search_params
+from utils.converter import render_deferred_page
+from utils.embedding_cache import EmbeddingCache
+from utils.image_inline import ImageInliner
+from utils.search_cache import SearchCache
+from utils.vector_filter import build_filter
 
 
 class VectorEngine:
@@ -14,70 +22,219 @@ class VectorEngine:
         self.qdrant_host = os.getenv("QDRANT_HOST", "http://localhost:6333")
         self.qdrant_api_key = os.getenv("QDRANT_API_KEY", None)
         print(self.qdrant_host, self.qdrant_api_key)
-        self.qdrant = QdrantClient(url=self.qdrant_host, api_key=self.qdrant_api_key)
+        self.qdrant = AsyncQdrantClient(
+            url=self.qdrant_host,
+            api_key=self.qdrant_api_key,
+            prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "0") == "1",
+        )
+        # Collections known to exist; kept in sync by ensure/delete
+        self.collections: Set[str] = set()
+        # Payload indexes known to exist per collection: {collection: {key: schema}}
+        self.indexes: Dict[str, Dict[str, str]] = {}
+        # Resolved collection profile per collection, used for search defaults
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.auto_index = os.getenv("QDRANT_AUTO_INDEX", "1") == "1"
+        self.ark = ArkClient()
+        self.embedding_cache = EmbeddingCache()
+        self.search_cache = SearchCache()
+        self.images = ImageInliner(render_missing=render_deferred_page)
+
+    async def startup(self) -> None:
+        self.ark.start()
+
+    async def shutdown(self) -> None:
+        await self.ark.close()
+        await self.qdrant.close()
 
-    async def get_embedding(self, inputs: List[Dict[str, Any]], instructions: str = "") -> List[float]:
+    async def get_embedding(self, inputs: List[Dict[str, Any]], instructions: str = "", use_cache: bool = True) -> List[float]:
         if not self.ark_api_key:
             raise ValueError("ARK_API_KEY未配置")
-        url = "https://ark.cn-beijing.volces.com/api/v3/embeddings/multimodal"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.ark_api_key}",
+
+        async def fetch() -> List[float]:
+            # Local /static images are sent inline, downscaled, instead of as URLs Ark would have to fetch
+            payload = {"model": self.ark_model, "input": await asyncio.to_thread(self.images.inline, inputs), "instructions": instructions}
+            data = await self.ark.post("/embeddings/multimodal", payload)
+            return data.get("data", {}).get("embedding")
+
+        if not use_cache:
+            return await fetch()
+        key = self.embedding_cache.key(self.ark_model, instructions, self.images.fingerprint(inputs))
+        return await self.embedding_cache.get_or_compute(key, fetch)
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        if collection_name in self.collections:
+            return True
+        # Only positive answers are cached: another worker may create the collection at any time
+        if await self.qdrant.collection_exists(collection_name):
+            self.collections.add(collection_name)
+            return True
+        return False
+
+    def invalidate_collection(self, collection_name: str) -> None:
+        self.collections.discard(collection_name)
+        self.indexes.pop(collection_name, None)
+        self.profiles.pop(collection_name, None)
+        self.search_cache.invalidate(collection_name)
+
+    async def _load_collection_info(self, collection_name: str) -> None:
+        """Fill the index and profile caches for a collection created elsewhere (or before a restart)."""
+        info = await self.qdrant.get_collection(collection_name)
+        self.indexes[collection_name] = {
+            key: str(getattr(schema.data_type, "value", schema.data_type))
+            for key, schema in (info.payload_schema or {}).items()
         }
-        payload = {"model": self.ark_model, "input": inputs, "instructions": instructions}
-        async with httpx.AsyncClient(timeout=300) as client:
-            r = await client.post(url, headers=headers, json=payload)
-            r.raise_for_status()
-            data = r.json()
-        return data.get("data", {}).get("embedding")
-
-    def _collection_exists(self, collection_name: str) -> bool:
-        cols = self.qdrant.get_collections().collections or []
-        names = [c.name for c in cols]
-        return collection_name in names
-
-    def ensure_collection(self, size: int, collection_name: str) -> None:
-        if self._collection_exists(collection_name):
+        if collection_name not in self.profiles:
+            quantization = info.config.quantization_config
+            base = "default"
+            if getattr(quantization, "binary", None) is not None:
+                base = "binary"
+            elif getattr(quantization, "scalar", None) is not None:
+                base = "scalar"
+            self.profiles[collection_name] = resolve_profile(base)
+
+    async def _known_indexes(self, collection_name: str) -> Dict[str, str]:
+        if collection_name not in self.indexes:
+            await self._load_collection_info(collection_name)
+        return self.indexes[collection_name]
+
+    async def _collection_profile(self, collection_name: str) -> Dict[str, Any]:
+        if collection_name not in self.profiles:
+            await self._load_collection_info(collection_name)
+        return self.profiles[collection_name]
+
+    async def create_indexes(self, collection_name: str, fields: Dict[str, str], wait: bool = True) -> Dict[str, str]:
+        """
+        Create payload indexes for {key: schema} that don't exist yet.
+        A key already indexed with another schema is left alone. Returns the indexes created.
+        With wait=False the requests return once Qdrant has accepted them and the indexes are built in the background.
+        """
+        known = await self._known_indexes(collection_name)
+        created = {}
+        for key, schema in fields.items():
+            schema = PayloadSchemaType(schema).value
+            if key in known:
+                continue
+            await self.qdrant.create_payload_index(collection_name=collection_name, field_name=key, field_schema=schema, wait=wait)
+            known[key] = schema
+            created[key] = schema
+        return created
+
+    async def _index_filter_keys(self, collection_name: str, schemas: Dict[str, str]) -> None:
+        """Index the keys a filter uses, so filtered searches don't fall back to full scans."""
+        if not self.auto_index or not schemas:
             return
-        self.qdrant.create_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(size=size, distance=Distance.COSINE),
-        )
+        try:
+            # Don't hold the search up while Qdrant builds the index; it serves unindexed until then
+            created = await self.create_indexes(collection_name, schemas, wait=False)
+            if created:
+                print(f"Created payload indexes on {collection_name}: {created}")
+        except Exception as e:
+            # The search itself still works without the index
+            print(f"Error creating payload indexes on {collection_name}: {e}")
+
+    async def create_collection(self, size: int, collection_name: str, profile: Union[str, Dict[str, Any], None] = None) -> bool:
+        """
+        Create a collection laid out according to profile (see utils.collection_profiles).
+        Returns False if it already exists; its layout is then left unchanged.
+        """
+        resolved = resolve_profile(profile)
+        if await self.collection_exists(collection_name):
+            return False
+        await self.qdrant.create_collection(collection_name=collection_name, **collection_config(size, resolved))
+        self.collections.add(collection_name)
+        self.profiles[collection_name] = resolved
+        return True
 
-    def upsert_vector(self, vector: List[float], payload: Dict[str, Any], collection_name: str) -> List[str]:
-        self.ensure_collection(len(vector), collection_name)
-        vid = str(uuid4())
+    async def ensure_collection(self, size: int, collection_name: str, profile: Union[str, Dict[str, Any], None] = None) -> None:
+        if await self.collection_exists(collection_name):
+            return
+        await self.create_collection(size, collection_name, profile)
+
+    async def _upsert(self, collection_name: str, points: List[PointStruct], wait: bool = True) -> None:
+        try:
+            await self.qdrant.upsert(collection_name=collection_name, points=points, wait=wait)
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            # The cached collection was deleted elsewhere; recreate it and retry once
+            profile = self.profiles.get(collection_name)
+            self.invalidate_collection(collection_name)
+            await self.ensure_collection(len(points[0].vector), collection_name, profile)
+            await self.qdrant.upsert(collection_name=collection_name, points=points, wait=wait)
+
+    def point_id(self, id: Optional[str] = None) -> Any:
+        """
+        Qdrant point IDs must be unsigned integers or UUIDs.
+        Other caller-supplied IDs are mapped to a stable UUIDv5, so re-ingesting overwrites the same point.
+        """
+        if id is None:
+            return str(uuid4())
+        if id.isdigit():
+            return int(id)
+        try:
+            return str(UUID(id))
+        except ValueError:
+            return str(uuid5(NAMESPACE_URL, id))
+
+    async def upsert_vector(self, vector: List[float], payload: Dict[str, Any], collection_name: str, point_id: Optional[str] = None, profile: Union[str, Dict[str, Any], None] = None) -> List[str]:
+        await self.ensure_collection(len(vector), collection_name, profile)
+        vid = self.point_id(point_id)
         points = [PointStruct(id=vid, vector=vector, payload=payload)]
-        self.qdrant.upsert(collection_name=collection_name, points=points)
+        try:
+            await self._upsert(collection_name, points)
+        finally:
+            self.search_cache.invalidate(collection_name)
         return vid
 
-    def delete_collection(self, collection_name: str) -> bool:
-        if self._collection_exists(collection_name):
-            self.qdrant.delete_collection(collection_name=collection_name)
-            return True
-        return False
+    async def upsert_vectors(self, points: List[Dict[str, Any]], collection_name: str, batch_size: int = 64, profile: Union[str, Dict[str, Any], None] = None) -> List[Optional[str]]:
+        """
+        Upsert [{"id", "vector", "payload"}] in batches.
+        Batches are sent with wait=False and only the last one waits: Qdrant applies updates in order,
+        so once it is applied the earlier batches are too.
+        Returns an error message per point, None where the write succeeded.
+        """
+        if not points:
+            return []
+        await self.ensure_collection(len(points[0]["vector"]), collection_name, profile)
+        batch_size = max(1, batch_size)
+        errors: List[Optional[str]] = []
+        try:
+            for start in range(0, len(points), batch_size):
+                batch = points[start:start + batch_size]
+                is_last = start + batch_size >= len(points)
+                try:
+                    await self._upsert(
+                        collection_name,
+                        [PointStruct(id=p["id"], vector=p["vector"], payload=p["payload"]) for p in batch],
+                        wait=is_last,
+                    )
+                    errors.extend([None] * len(batch))
+                except Exception as e:
+                    errors.extend([str(e)] * len(batch))
+        finally:
+            # After the last, waited-for batch, so searches from then on see every write
+            self.search_cache.invalidate(collection_name)
+        return errors
 
-    def search_vectors(self, vector: List[float], limit: int = 5, collection_name: str = "", filter: Optional[Dict[str, Any]] = None, score_threshold: float = 0.2) -> List[Dict[str, Any]]:
-        self.ensure_collection(len(vector), collection_name)
+    async def delete_collection(self, collection_name: str) -> bool:
+        exists = await self.collection_exists(collection_name)
+        try:
+            if exists:
+                await self.qdrant.delete_collection(collection_name=collection_name)
+                return True
+            return False
+        finally:
+            # After the delete, so a search running meanwhile can't cache results from the old collection
+            self.invalidate_collection(collection_name)
 
-        q_filter = None
-        if filter:
-            conditions = []
-            for key, value in filter.items():
-                conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
-            if conditions:
-                q_filter = Filter(must=conditions)
+    async def _build_filter(self, filter: Optional[Dict[str, Any]], collection_name: str):
+        q_filter, schemas = build_filter(filter)
+        await self._index_filter_keys(collection_name, schemas)
+        return q_filter
 
-        res = self.qdrant.search(
-            collection_name=collection_name,
-            query_vector=vector,
-            query_filter=q_filter,
-            limit=limit,
-            with_payload=True,
-            score_threshold=score_threshold,
-        )
+    def _format_hits(self, points) -> List[Dict[str, Any]]:
         out = []
-        for p in res:
+        for p in points:
             out.append({
                 "id": str(p.id),
                 "score": p.score,
@@ -85,28 +242,115 @@ class VectorEngine:
             })
         return out
 
-    def query_vectors(self, query: Dict[str, Any], limit: int = 5, collection_name: str = "") -> List[Dict[str, Any]]:
-        if not self._collection_exists(collection_name):
+    async def _search_params(self, collection_name: str, hnsw_ef: Optional[int] = None, oversampling: Optional[float] = None, rescore: Optional[bool] = None):
+        return search_params(hnsw_ef, oversampling, rescore, await self._collection_profile(collection_name))
+
+    async def search_vectors(self, vector: List[float], limit: int = 5, collection_name: str = "", filter: Optional[Dict[str, Any]] = None, score_threshold: float = 0.2, hnsw_ef: Optional[int] = None, oversampling: Optional[float] = None, rescore: Optional[bool] = None) -> List[Dict[str, Any]]:
+        await self.ensure_collection(len(vector), collection_name)
+
+        res = await self.qdrant.query_points(
+            collection_name=collection_name,
+            query=vector,
+            query_filter=await self._build_filter(filter, collection_name),
+            search_params=await self._search_params(collection_name, hnsw_ef, oversampling, rescore),
+            limit=limit,
+            with_payload=True,
+            score_threshold=score_threshold,
+        )
+        return self._format_hits(res.points)
+
+    def search_cache_key(self, collection_name: str, items: List[Dict[str, Any]], instructions: str, limit: int, filter: Optional[Dict[str, Any]],
+                         score_threshold: float, hnsw_ef: Optional[int] = None, oversampling: Optional[float] = None, rescore: Optional[bool] = None) -> str:
+        params = {"limit": limit, "filter": filter, "score": score_threshold, "hnswEf": hnsw_ef, "oversampling": oversampling, "rescore": rescore}
+        return self.search_cache.key(collection_name, self.ark_model, instructions, self.images.fingerprint(items), params)
+
+    async def search_items(self, items: List[Dict[str, Any]], instructions: str = "", limit: int = 5, collection_name: str = "", filter: Optional[Dict[str, Any]] = None,
+                           score_threshold: float = 0.2, hnsw_ef: Optional[int] = None, oversampling: Optional[float] = None, rescore: Optional[bool] = None,
+                           use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Embed items and search with the vector; repeated searches are answered from the search cache."""
+        async def compute() -> List[Dict[str, Any]]:
+            vector = await self.get_embedding(items, instructions, use_cache=use_cache)
+            return await self.search_vectors(vector, limit, collection_name, filter, score_threshold, hnsw_ef, oversampling, rescore)
+
+        if not use_cache or not self.search_cache.enabled:
+            return await compute()
+        key = self.search_cache_key(collection_name, items, instructions, limit, filter, score_threshold, hnsw_ef, oversampling, rescore)
+        return await self.search_cache.get_or_compute(key, collection_name, compute)
+
+    async def search_vectors_batch(self, searches: List[Dict[str, Any]], collection_name: str) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches on one collection in a single Qdrant request.
+        Each search is {"vector", "limit", "filter", "score_threshold", "hnsw_ef", "oversampling", "rescore"};
+        results come back in the same order.
+        """
+        if not searches:
             return []
+        await self.ensure_collection(len(searches[0]["vector"]), collection_name)
 
-        conditions = []
-        for key, value in query.items():
-            conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
+        requests = [
+            QueryRequest(
+                query=search["vector"],
+                filter=await self._build_filter(search.get("filter"), collection_name),
+                params=await self._search_params(collection_name, search.get("hnsw_ef"), search.get("oversampling"), search.get("rescore")),
+                limit=search.get("limit", 5),
+                score_threshold=search.get("score_threshold", 0.2),
+                with_payload=True,
+            )
+            for search in searches
+        ]
+        responses = await self.qdrant.query_batch_points(collection_name=collection_name, requests=requests)
+        return [self._format_hits(res.points) for res in responses]
 
-        q_filter = Filter(must=conditions) if conditions else None
+    def _format_point(self, p, with_vectors: bool = False) -> Dict[str, Any]:
+        point = {
+            "id": str(p.id),
+            "payload": p.payload or {},
+        }
+        if with_vectors:
+            point["vector"] = p.vector
+        return point
 
-        res, _ = self.qdrant.scroll(
+    async def query_vectors(self, query: Dict[str, Any], limit: int = 5, collection_name: str = "", offset: Optional[Any] = None) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """
+        One page of points matching query, starting at offset.
+        Returns (points, next offset); the next offset is None after the last page.
+        """
+        if not await self.collection_exists(collection_name):
+            return [], None
+
+        q_filter = await self._build_filter(query, collection_name)
+
+        res, next_offset = await self.qdrant.scroll(
             collection_name=collection_name,
             scroll_filter=q_filter,
             limit=limit,
+            offset=offset,
             with_payload=True,
             with_vectors=False
         )
+        return [self._format_point(p) for p in res], next_offset
 
-        out = []
-        for p in res:
-            out.append({
-                "id": str(p.id),
-                "payload": p.payload or {},
-            })
-        return out
+    async def scroll_vectors(self, collection_name: str, query: Optional[Dict[str, Any]] = None, page_size: int = 256, with_vectors: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every point matching query, one scroll page in memory at a time."""
+        q_filter = await self._build_filter(query, collection_name)
+        offset = None
+        while True:
+            res, offset = await self.qdrant.scroll(
+                collection_name=collection_name,
+                scroll_filter=q_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            for p in res:
+                yield self._format_point(p, with_vectors)
+            if offset is None:
+                return
+
+def _is_not_found(e: Exception) -> bool:
+    """True for Qdrant "collection not found" errors from either the REST or the gRPC client."""
+    if getattr(e, "status_code", None) == 404:
+        return True
+    code = getattr(e, "code", None)
+    return callable(code) and getattr(code(), "name", "") == "NOT_FOUND"
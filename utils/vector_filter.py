@@ -0,0 +1,145 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from qdrant_client.models import (
+    DatetimeRange,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchExcept,
+    MatchValue,
+    Nested,
+    NestedCondition,
+    PayloadSchemaType,
+    Range,
+)
+
+RANGE_OPS = {"$gt": "gt", "$gte": "gte", "$lt": "lt", "$lte": "lte"}
+CLAUSE_OPS = {"$must": "must", "$should": "should", "$must_not": "must_not"}
+
+
+def _is_datetime(value: Any) -> bool:
+    if not isinstance(value, str):
+        return False
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return True
+    except ValueError:
+        return False
+
+
+def _value_schema(value: Any) -> Optional[PayloadSchemaType]:
+    # bool first: it is a subclass of int
+    if isinstance(value, bool):
+        return PayloadSchemaType.BOOL
+    if isinstance(value, int):
+        return PayloadSchemaType.INTEGER
+    if isinstance(value, float):
+        return PayloadSchemaType.FLOAT
+    if isinstance(value, str):
+        return PayloadSchemaType.KEYWORD
+    return None
+
+
+def _values_schema(values: List[Any]) -> Optional[PayloadSchemaType]:
+    schemas = {_value_schema(v) for v in values}
+    if schemas == {PayloadSchemaType.INTEGER, PayloadSchemaType.FLOAT}:
+        return PayloadSchemaType.FLOAT
+    return schemas.pop() if len(schemas) == 1 else None
+
+
+class FilterBuilder:
+    def __init__(self) -> None:
+        # payload key -> index schema inferred from the filter values
+        self.schemas: Dict[str, PayloadSchemaType] = {}
+
+    def _note(self, key: str, schema: Optional[PayloadSchemaType]) -> None:
+        if schema is not None:
+            self.schemas.setdefault(key, schema)
+
+    def _field(self, key: str, spec: Any, index_prefix: str) -> Tuple[List[Any], List[Any]]:
+        """Conditions for one key as (must, must_not)."""
+        index_key = index_prefix + key
+        if not isinstance(spec, dict):
+            if isinstance(spec, (list, tuple)):
+                raise ValueError(f"filter value for '{key}' is a list; use {{\"$in\": [...]}} to match any of them")
+            self._note(index_key, _value_schema(spec))
+            return [FieldCondition(key=key, match=MatchValue(value=spec))], []
+
+        if not any(op.startswith("$") for op in spec):
+            # Plain object: filter on its fields as nested keys
+            must, must_not = [], []
+            for sub_key, sub_spec in spec.items():
+                m, n = self._field(f"{key}.{sub_key}", sub_spec, index_prefix)
+                must += m
+                must_not += n
+            return must, must_not
+
+        must, must_not = [], []
+        bounds = {}
+        for op, value in spec.items():
+            if op in RANGE_OPS:
+                bounds[RANGE_OPS[op]] = value
+            elif op == "$in":
+                values = list(value)
+                self._note(index_key, _values_schema(values))
+                must.append(FieldCondition(key=key, match=MatchAny(any=values)))
+            elif op == "$nin":
+                values = list(value)
+                self._note(index_key, _values_schema(values))
+                must.append(FieldCondition(key=key, match=MatchExcept(**{"except": values})))
+            elif op == "$ne":
+                self._note(index_key, _value_schema(value))
+                must_not.append(FieldCondition(key=key, match=MatchValue(value=value)))
+            elif op == "$eq":
+                self._note(index_key, _value_schema(value))
+                must.append(FieldCondition(key=key, match=MatchValue(value=value)))
+            elif op == "$elem":
+                nested = self.build(value, index_prefix=f"{index_key}[].")
+                if nested is not None:
+                    must.append(NestedCondition(nested=Nested(key=key, filter=nested)))
+            else:
+                raise ValueError(f"unsupported filter operator '{op}' on '{key}'")
+
+        if bounds:
+            if all(_is_datetime(v) for v in bounds.values()):
+                self._note(index_key, PayloadSchemaType.DATETIME)
+                must.append(FieldCondition(key=key, range=DatetimeRange(**bounds)))
+            elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in bounds.values()):
+                self._note(index_key, _values_schema(list(bounds.values())))
+                must.append(FieldCondition(key=key, range=Range(**bounds)))
+            else:
+                raise ValueError(f"range bounds for '{key}' must all be numbers or all ISO datetimes")
+        return must, must_not
+
+    def build(self, spec: Optional[Dict[str, Any]], index_prefix: str = "") -> Optional[Filter]:
+        if not spec:
+            return None
+        if not isinstance(spec, dict):
+            raise ValueError("filter must be an object")
+        clauses: Dict[str, List[Any]] = {"must": [], "should": [], "must_not": []}
+        for key, value in spec.items():
+            if key in CLAUSE_OPS:
+                subs = value if isinstance(value, list) else [value]
+                for sub in subs:
+                    sub_filter = self.build(sub, index_prefix)
+                    if sub_filter is not None:
+                        clauses[CLAUSE_OPS[key]].append(sub_filter)
+            elif key.startswith("$"):
+                raise ValueError(f"unsupported filter operator '{key}'")
+            else:
+                must, must_not = self._field(key, value, index_prefix)
+                clauses["must"] += must
+                clauses["must_not"] += must_not
+        if not any(clauses.values()):
+            return None
+        return Filter(**{k: v for k, v in clauses.items() if v})
+
+
+def build_filter(spec: Optional[Dict[str, Any]]) -> Tuple[Optional[Filter], Dict[str, PayloadSchemaType]]:
+    """
+    Translate a DSL filter (syntax in the README) such as {"page": {"$gte": 2}, "tag": {"$in": ["a"]}}.
+    Returns the Qdrant filter and {payload key: index schema} for the keys it uses.
+    """
+    builder = FilterBuilder()
+    return builder.build(spec), builder.schemas
@@ -0,0 +1,155 @@
+import os
+import re
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from utils.options import merge_options
+
+_SHOWINFO_RE = re.compile(r"\[Parsed_showinfo_\d+ @ [^\]]+\] n:\s*(\d+) .*?pts_time:([-\d.]+)")
+
+# Out of 64 bits; small enough to keep slides that differ by a line of text
+SCENE_DEDUP_DISTANCE = 4
+
+DEFAULT_VIDEO_OPTIONS = {
+    # interval: one frame every `interval` seconds
+    # scene: only frames where the picture changes by more than scene_threshold
+    "mode": "interval",
+    "scene_threshold": 0.3,
+    # Drop a frame whose perceptual hash is within this Hamming distance of the last kept frame (0 disables).
+    # None picks a per-mode default: on for scene mode, off for interval mode.
+    "dedup_distance": None,
+    # Upper bound on extracted frames (0 means no limit)
+    "max_frames": 0,
+}
+
+
+def get_video_options(options: Dict[str, Any] = None) -> Dict[str, Any]:
+    return merge_options(DEFAULT_VIDEO_OPTIONS, options)
+
+
+def dhash(image_path: str, size: int = 8) -> int:
+    """64-bit difference hash: robust to re-encoding and small changes, cheap to compute."""
+    with Image.open(image_path) as image:
+        pixels = list(image.convert("L").resize((size + 1, size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def dedup_frames(frames: List[Dict[str, Any]], max_distance: int) -> List[Dict[str, Any]]:
+    """Remove frames that look like the previously kept one. Dropped frame files are deleted."""
+    kept = []
+    last_hash: Optional[int] = None
+    for frame in frames:
+        frame_hash = dhash(frame["path"])
+        if last_hash is not None and bin(frame_hash ^ last_hash).count("1") <= max_distance:
+            os.remove(frame["path"])
+            continue
+        kept.append(frame)
+        last_hash = frame_hash
+    return kept
+
+
+def extract_frames(video_path: str, output_dir: str, interval: float = 1.0, max_width: int = None, max_height: int = None, options: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """
+    Extract frames with ffmpeg as frame_001.jpg, frame_002.jpg, ... in output_dir.
+    Returns [{"path", "time"}] where time is the frame timestamp in seconds.
+    """
+    options = get_video_options(options)
+    dedup_distance = options["dedup_distance"]
+    if dedup_distance is None:
+        dedup_distance = SCENE_DEDUP_DISTANCE if options["mode"] == "scene" else 0
+    max_frames = options["max_frames"]
+
+    # Frames from a previous run with other settings would otherwise mix into this one
+    for name in os.listdir(output_dir):
+        if name.startswith("frame_") and name.endswith(".jpg"):
+            os.remove(os.path.join(output_dir, name))
+
+    vf_filters = []
+    if options["mode"] == "scene":
+        # Always keep the first frame, then every frame whose scene score exceeds the threshold
+        vf_filters.append(f"select='eq(n\\,0)+gt(scene\\,{options['scene_threshold']})'")
+    elif interval > 0:
+        vf_filters.append(f"fps=1/{interval}")
+
+    if max_width and max_height:
+        # Scale while keeping aspect ratio, fit within box
+        # force_original_aspect_ratio=decrease ensures it fits inside the box
+        vf_filters.append(f"scale='min({max_width},iw)':'min({max_height},ih)':force_original_aspect_ratio=decrease")
+
+    # showinfo logs the timestamp of every frame that reaches the output
+    vf_filters.append("showinfo")
+
+    cmd = [
+        "ffmpeg",
+        "-i", video_path,
+        "-vf", ",".join(vf_filters),
+        "-fps_mode", "vfr",
+        "-q:v", "2",  # High quality
+    ]
+    # With dedup the cap applies to the frames that survive it, so ffmpeg can't stop early
+    if max_frames and not dedup_distance:
+        cmd += ["-frames:v", str(max_frames)]
+    cmd.append(os.path.join(output_dir, "frame_%03d.jpg"))
+
+    proc = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = proc.stderr.decode("utf-8", errors="replace")
+
+    frames = []
+    for m in _SHOWINFO_RE.finditer(stderr):
+        index = int(m.group(1))
+        path = os.path.join(output_dir, f"frame_{index + 1:03d}.jpg")
+        if os.path.exists(path):
+            frames.append({"path": path, "time": round(float(m.group(2)), 3)})
+
+    if dedup_distance > 0:
+        frames = dedup_frames(frames, dedup_distance)
+        if max_frames:
+            for frame in frames[max_frames:]:
+                os.remove(frame["path"])
+            frames = frames[:max_frames]
+    return frames
+
+
+def extract_audio(video_path: str, output_dir: str) -> Optional[str]:
+    """
+    Extract the audio track as 16 kHz mono WAV, the format Whisper works in.
+    -vn makes ffmpeg skip video decoding, so this pass only demuxes and decodes audio.
+    Returns the WAV path, or None if the video has no audio track.
+    """
+    audio_path = os.path.join(output_dir, "audio.wav")
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-i", video_path,
+        "-map", "0:a:0?",
+        "-vn",
+        "-ac", "1",
+        "-ar", "16000",
+        audio_path
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0 or not os.path.exists(audio_path) or os.path.getsize(audio_path) <= 44:
+        # Nothing but a WAV header means there was no audio stream to map
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+        return None
+    return audio_path
+
+
+def align_transcript(frames: List[Dict[str, Any]], segments: List[Dict[str, Any]]) -> None:
+    """
+    Attach to each frame the speech spoken while it was on screen,
+    i.e. segments overlapping [frame time, next frame time).
+    """
+    for i, frame in enumerate(frames):
+        start = frame["time"]
+        end = frames[i + 1]["time"] if i + 1 < len(frames) else float("inf")
+        frame["text"] = "".join(s["text"] for s in segments if s["start"] < end and s["end"] > start)